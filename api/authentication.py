@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import bump_version, get_versions
+
+# Everything permissions and the `me` endpoint read from request.user.
+CACHED_USER_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'bio', 'role',
+    'is_superuser', 'is_staff', 'is_active',
+)
+USER_KEY = 'auth-user:{}:{}'
+USER_VERSION_KEY = 'auth-user-version:{}'
+
+
+def bump_user_version(user_id):
+    bump_version(USER_VERSION_KEY.format(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    ''' JWTAuthentication that keeps the token owner in the cache.
+
+    Entries are keyed by user id and a version bumped on every save or
+    delete of the user (see api/signals.py). A cache hit builds the user
+    with `from_db()` from the cached fields, so authentication costs no
+    queries; fields that are not cached stay deferred, and saving such an
+    instance only writes the loaded fields.
+
+    Versions are only seen by every worker in a shared cache: with a
+    per-process one (locmem) a deactivated user or a revoked role would
+    stay cached in the other workers, so users are then always loaded
+    from the database.
+    '''
+
+    def get_user(self, validated_token):
+        if not settings.CACHE_IS_SHARED:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification'))
+        [version] = get_versions([USER_VERSION_KEY.format(user_id)])
+        key = USER_KEY.format(user_id, version)
+        values = cache.get(key)
+        if values is None:
+            user = super().get_user(validated_token)
+            cache.set(
+                key,
+                {field: getattr(user, field) for field in CACHED_USER_FIELDS},
+                settings.AUTH_USER_CACHE_TIMEOUT,
+            )
+            return user
+        # from_db() expects the values in the order of the model fields
+        field_names = [
+            field.attname for field in self.user_model._meta.concrete_fields
+            if field.attname in values
+        ]
+        user = self.user_model.from_db(
+            DEFAULT_DB_ALIAS, field_names,
+            [values[name] for name in field_names])
+        if not user.is_active:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive')
+        return user
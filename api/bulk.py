@@ -0,0 +1,219 @@
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+
+from reviews.changes import log_changes
+from reviews.models import Category, ChangeLog, Genre, Title
+from .serializers import (CategoryBulkSerializer, GenreBulkSerializer,
+                          TitleBulkSerializer, TitleBulkUpdateSerializer)
+from .signals import bump_after_commit
+
+
+def insert(model, objects, batch_size):
+    ''' bulk_create in batches of at most batch_size, within the limit
+    of query parameters of the backend '''
+    connection = connections[router.db_for_write(model)]
+    limit = connection.ops.bulk_batch_size(
+        [field for field in model._meta.concrete_fields
+         if not field.primary_key], objects)
+    model._default_manager.bulk_create(
+        objects, batch_size=max(1, min(
+            batch_size or settings.BULK_BATCH_SIZE, limit)))
+
+
+def validate_items(serializer_class, items, partial=False):
+    ''' Validates every item on its own; returns the validated data
+    (None for invalid items) and the errors, one dict per item '''
+    if not isinstance(items, list):
+        raise serializers.ValidationError('Expected a list of items.')
+    if len(items) > settings.BULK_MAX_ITEMS:
+        raise serializers.ValidationError(
+            f'Ensure there are no more than {settings.BULK_MAX_ITEMS} '
+            f'items.')
+    validated, errors = [], []
+    for item in items:
+        serializer = serializer_class(data=item, partial=partial)
+        if serializer.is_valid():
+            validated.append(serializer.validated_data)
+            errors.append({})
+        else:
+            validated.append(None)
+            errors.append(serializer.errors)
+    return validated, errors
+
+
+def add_error(errors, index, field, message):
+    errors[index].setdefault(field, []).append(message)
+
+
+def bulk_create_slugged(model, serializer_class, items, batch_size=None):
+    ''' Creates categories or genres; name and slug uniqueness is
+    checked against the database in one query '''
+    validated, errors = validate_items(serializer_class, items)
+    valid = [data for data in validated if data is not None]
+    names = {data['name'] for data in valid}
+    slugs = {data['slug'] for data in valid}
+    taken = {'name': set(), 'slug': set()}
+    for name, slug in model.objects.filter(
+            Q(name__in=names) | Q(slug__in=slugs)).values_list(
+            'name', 'slug'):
+        taken['name'].add(name)
+        taken['slug'].add(slug)
+    for index, data in enumerate(validated):
+        if data is None:
+            continue
+        for field, values in taken.items():
+            if data[field] in values:
+                add_error(errors, index, field,
+                          f'{model._meta.verbose_name} with this {field} '
+                          f'already exists.')
+            values.add(data[field])
+    if any(errors):
+        return None, errors
+    objects = [model(**data) for data in validated]
+    insert(model, objects, batch_size)
+    # bulk_create sends no post_save and may not return ids
+    log_changes(
+        model, model.objects.filter(slug__in=slugs).values_list(
+            'pk', flat=True), ChangeLog.CREATE)
+    bump_after_commit(model)
+    return [dict(data) for data in validated], errors
+
+
+def bulk_create_categories(items, batch_size=None):
+    return bulk_create_slugged(
+        Category, CategoryBulkSerializer, items, batch_size)
+
+
+def bulk_create_genres(items, batch_size=None):
+    return bulk_create_slugged(
+        Genre, GenreBulkSerializer, items, batch_size)
+
+
+def resolve_slugs(validated, errors):
+    ''' Resolves the category and genre slugs of the whole payload with
+    one query per model; unknown slugs are reported per item '''
+    valid = [data for data in validated if data is not None]
+    categories = dict(Category.objects.filter(
+        slug__in={data['category'] for data in valid if 'category' in data}
+    ).values_list('slug', 'id'))
+    genres = dict(Genre.objects.filter(
+        slug__in={slug for data in valid for slug in data.get('genre', ())}
+    ).values_list('slug', 'id'))
+    for index, data in enumerate(validated):
+        if data is None:
+            continue
+        if 'category' in data and data['category'] not in categories:
+            add_error(errors, index, 'category',
+                      f'Object with slug={data["category"]} does not exist.')
+        if 'genre' in data:
+            data['genre'] = list(dict.fromkeys(data['genre']))
+            for slug in data['genre']:
+                if slug not in genres:
+                    add_error(errors, index, 'genre',
+                              f'Object with slug={slug} does not exist.')
+    return categories, genres
+
+
+def insert_title_genres(titles, validated, genres, batch_size):
+    through = Title.genre.through
+    insert(through, [
+        through(title_id=title.pk, genre_id=genres[slug])
+        for title, data in zip(titles, validated)
+        for slug in data.get('genre', ())
+    ], batch_size)
+
+
+def bulk_create_titles(items, batch_size=None):
+    ''' Creates titles with their genres.
+
+    Category and genre slugs of the whole payload are resolved with one
+    query per model, and titles and genre links are inserted with
+    bulk_create. Backends that do not return ids from a bulk insert
+    (SQLite, MySQL) insert titles one by one, since the links need them.
+    '''
+    validated, errors = validate_items(TitleBulkSerializer, items)
+    categories, genres = resolve_slugs(validated, errors)
+    if any(errors):
+        return None, errors
+    titles = [
+        Title(
+            name=data['name'],
+            year=data['year'],
+            description=data.get('description', ''),
+            category_id=categories[data['category']],
+        )
+        for data in validated
+    ]
+    connection = connections[router.db_for_write(Title)]
+    if connection.features.can_return_ids_from_bulk_insert:
+        insert(Title, titles, batch_size)
+        log_changes(
+            Title, [title.pk for title in titles], ChangeLog.CREATE)
+    else:
+        for title in titles:
+            title.save()
+    insert_title_genres(titles, validated, genres, batch_size)
+    bump_after_commit(Title)
+    return [
+        {'id': title.pk, **data} for title, data in zip(titles, validated)
+    ], errors
+
+
+def bulk_update_titles(items, batch_size=None):
+    ''' Updates titles by id; every item holds the id and the fields to
+    change.
+
+    Titles are loaded with one query and written with bulk_update; the
+    genre links of items that list genres are replaced with one delete
+    and one bulk insert.
+    '''
+    validated, errors = validate_items(
+        TitleBulkUpdateSerializer, items, partial=True)
+    categories, genres = resolve_slugs(validated, errors)
+    titles = Title.objects.in_bulk(
+        {data['id'] for data in validated if data is not None})
+    seen = set()
+    for index, data in enumerate(validated):
+        if data is None:
+            continue
+        if data['id'] not in titles:
+            add_error(errors, index, 'id',
+                      f'Object with id={data["id"]} does not exist.')
+        elif data['id'] in seen:
+            add_error(errors, index, 'id',
+                      f'Title with id={data["id"]} is listed twice.')
+        seen.add(data['id'])
+    if any(errors):
+        return None, errors
+    now = timezone.now()
+    fields = {'updated_at'}
+    updated = []
+    for data in validated:
+        title = titles[data['id']]
+        for field in ('name', 'year', 'description'):
+            if field in data:
+                setattr(title, field, data[field])
+                fields.add(field)
+        if 'category' in data:
+            title.category_id = categories[data['category']]
+            fields.add('category')
+        title.updated_at = now
+        updated.append(title)
+    Title.objects.bulk_update(
+        updated, sorted(fields),
+        batch_size=batch_size or settings.BULK_BATCH_SIZE)
+    relinked = [
+        (title, data) for title, data in zip(updated, validated)
+        if 'genre' in data
+    ]
+    Title.genre.through.objects.filter(
+        title_id__in=[title.pk for title, _ in relinked]).delete()
+    insert_title_genres(
+        [title for title, _ in relinked], [data for _, data in relinked],
+        genres, batch_size)
+    log_changes(Title, [title.pk for title in updated], ChangeLog.UPDATE)
+    bump_after_commit(Title)
+    return [dict(data) for data in validated], errors
@@ -0,0 +1,78 @@
+import time
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+
+GENERATION_KEY = 'generation:{}'
+RESPONSE_KEY = 'response:{}'
+STATS_KEY = 'response-cache:{}'
+
+
+def generation_key(model):
+    return GENERATION_KEY.format(model._meta.label_lower)
+
+
+def get_versions(keys):
+    ''' Returns current values of version counters.
+
+    A missing counter (never bumped or evicted) starts from the current
+    time in nanoseconds, so it never repeats a number that cached entries
+    may still be keyed with.
+    '''
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def get_generations(models):
+    return get_versions([generation_key(model) for model in models])
+
+
+def bump_generation(model):
+    bump_version(generation_key(model))
+
+
+def response_cache_key(path, models):
+    fingerprint = repr((path, get_generations(models)))
+    return RESPONSE_KEY.format(md5(fingerprint.encode()).hexdigest())
+
+
+def get_cached_response(path, models):
+    key = response_cache_key(path, models)
+    data = cache.get(key)
+    record_lookup(hit=data is not None)
+    return key, data
+
+
+def set_cached_response(key, data):
+    cache.set(key, data, settings.RESPONSE_CACHE_TIMEOUT)
+
+
+def record_lookup(hit):
+    key = STATS_KEY.format('hits' if hit else 'misses')
+    if cache.add(key, 1, None):
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def get_stats():
+    stats = cache.get_many(
+        [STATS_KEY.format('hits'), STATS_KEY.format('misses')])
+    return {
+        'hits': stats.get(STATS_KEY.format('hits'), 0),
+        'misses': stats.get(STATS_KEY.format('misses'), 0),
+    }
@@ -0,0 +1,55 @@
+from collections import defaultdict
+
+from django.db.models import Prefetch
+
+from reviews.models import Category, ChangeLog, Comment, Genre, Review, Title
+from .serializers import (CategoryChangeSerializer, CommentChangeSerializer,
+                          GenreChangeSerializer, ReviewChangeSerializer,
+                          TitleChangeSerializer)
+
+# Response key, live objects and serializer of every tracked model
+FEEDS = (
+    ('categories', Category.objects.all(), CategoryChangeSerializer),
+    ('genres', Genre.objects.all(), GenreChangeSerializer),
+    ('titles', Title.objects.select_related('category').prefetch_related(
+        Prefetch('genre', Genre.objects.only('pk', 'slug'))),
+     TitleChangeSerializer),
+    # Reviews and comments of soft-deleted titles are listed as deleted
+    ('reviews', Review.objects.filter(title__deleted_at__isnull=True)
+     .select_related('author'), ReviewChangeSerializer),
+    ('comments', Comment.objects.filter(
+        review__title__deleted_at__isnull=True).select_related('author'),
+     CommentChangeSerializer),
+)
+
+
+def build_delta(entries):
+    ''' Collapses change log entries to the current state of every
+    changed object.
+
+    Objects that still exist are serialized, one query per model; the
+    others (deleted, soft-deleted or purged) are listed by id under
+    `deleted`. Models without changes are left out.
+    '''
+    actions = defaultdict(dict)
+    for entry in entries:
+        actions[entry.model][entry.object_id] = entry.action
+    delta = {}
+    for key, queryset, serializer_class in FEEDS:
+        changed = actions.get(queryset.model._meta.model_name)
+        if not changed:
+            continue
+        alive = [
+            object_id for object_id, action in changed.items()
+            if action != ChangeLog.DELETE
+        ]
+        objects = (
+            list(queryset.filter(pk__in=alive).order_by('pk'))
+            if alive else []
+        )
+        found = {obj.pk for obj in objects}
+        delta[key] = {
+            'changed': serializer_class(objects, many=True).data,
+            'deleted': sorted(set(changed) - found),
+        }
+    return delta
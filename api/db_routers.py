@@ -0,0 +1,57 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_PREFIX = 'replica_'
+PIN_KEY = 'db-pin:{}'
+
+use_replica = ContextVar('use_replica', default=False)
+
+
+def get_replicas():
+    return [
+        alias for alias in connections.databases
+        if alias.startswith(REPLICA_PREFIX)
+    ]
+
+
+def pin_to_primary(user):
+    ''' Sends reads of the user to the primary for REPLICA_PIN_SECONDS,
+    so they see their own writes while the replicas catch up.
+
+    The pin lives in the cache shared by all workers, since the next
+    request of the user may land on any of them.
+    '''
+    cache.set(PIN_KEY.format(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user):
+    if not user.is_authenticated:
+        return False
+    if not settings.CACHE_IS_SHARED:
+        # Pins in a per-process cache are invisible to other workers
+        return True
+    return cache.get(PIN_KEY.format(user.pk), False)
+
+
+class ReplicaRouter:
+    ''' Routes reads to a random `replica_*` database while the current
+    request allows it (see ReplicaReadMixin); everything else, including
+    all writes, goes to the primary '''
+
+    def db_for_read(self, model, **hints):
+        if use_replica.get():
+            replicas = get_replicas()
+            if replicas:
+                return random.choice(replicas)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
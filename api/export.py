@@ -0,0 +1,94 @@
+import csv
+import json
+from collections import defaultdict
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from reviews.models import Title
+
+TITLE_COLUMNS = (
+    'id', 'name', 'year', 'description', 'rating', 'category', 'genre',
+    'updated_at',
+)
+REVIEW_COLUMNS = (
+    'id', 'title_id', 'author', 'text', 'score', 'pub_date', 'updated_at',
+)
+
+
+class Echo:
+    ''' File-like object that hands written lines back to the caller '''
+
+    def write(self, value):
+        return value
+
+
+def iter_title_rows(queryset, chunk_size):
+    ''' Yields titles with their category and genres inlined.
+
+    Titles are read through a server-side cursor; genres are fetched with
+    one query per chunk, since prefetch_related is ignored by iterator().
+    '''
+    titles = queryset.select_related('category').iterator(
+        chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(titles, chunk_size))
+        if not chunk:
+            return
+        genres = defaultdict(list)
+        links = Title.genre.through.objects.filter(
+            title_id__in=[title.id for title in chunk]
+        ).select_related('genre').order_by('genre_id')
+        for link in links:
+            genres[link.title_id].append(
+                {'name': link.genre.name, 'slug': link.genre.slug})
+        for title in chunk:
+            category = title.category
+            yield {
+                'id': title.id,
+                'name': title.name,
+                'year': title.year,
+                'description': title.description,
+                'rating': title.rating,
+                'category': category and {
+                    'name': category.name, 'slug': category.slug},
+                'genre': genres[title.id],
+                'updated_at': title.updated_at,
+            }
+
+
+def iter_review_rows(queryset, chunk_size):
+    reviews = queryset.select_related('author').iterator(
+        chunk_size=chunk_size)
+    for review in reviews:
+        yield {
+            'id': review.id,
+            'title_id': review.title_id,
+            'author': review.author.username,
+            'text': review.text,
+            'score': review.score,
+            'pub_date': review.pub_date,
+            'updated_at': review.updated_at,
+        }
+
+
+def render_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def flatten(value):
+    if isinstance(value, dict):
+        return value['slug']
+    if isinstance(value, list):
+        return ','.join(item['slug'] for item in value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def render_csv(rows, columns):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([flatten(row[column]) for column in columns])
@@ -1,13 +1,104 @@
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models import Case, Exists, IntegerField, OuterRef, When
 from django_filters import rest_framework as filters
+from rest_framework.filters import SearchFilter
 
-from reviews.models import Title
+from reviews.models import Category, Title
+
+ANY = 'any'
+ALL = 'all'
+
+
+class CharInFilter(filters.BaseInFilter, filters.CharFilter):
+    pass
+
+
+class StableOrderingFilter(filters.OrderingFilter):
+    ''' Adds the primary key to the ordering, so pages do not overlap '''
+
+    def filter(self, qs, value):
+        qs = super().filter(qs, value)
+        if value:
+            qs = qs.order_by(*qs.query.order_by, '-pk')
+        return qs
 
 
 class TitleFilter(filters.FilterSet):
-    genre = filters.Filter(field_name='genre__slug')
-    category = filters.Filter(field_name='category__slug')
+    ''' Filters titles without joining the genre table.
+
+    `genre` and `category` take comma separated slugs; with
+    `genre_match=all` a title needs every listed genre. Genres are
+    matched with EXISTS subqueries on the through table and categories
+    with an IN subquery, so titles are never duplicated and are looked
+    up by title_genre_genre_title_idx and title_category_year_idx.
+    '''
+    genre = CharInFilter(method='filter_genre')
+    genre_match = filters.ChoiceFilter(
+        choices=((ANY, ANY), (ALL, ALL)), method='filter_genre_match')
+    category = CharInFilter(method='filter_category')
     name = filters.Filter(field_name='name', lookup_expr='contains')
+    min_year = filters.NumberFilter(field_name='year', lookup_expr='gte')
+    max_year = filters.NumberFilter(field_name='year', lookup_expr='lte')
+    min_rating = filters.NumberFilter(
+        field_name='rating', lookup_expr='gte')
+    max_rating = filters.NumberFilter(
+        field_name='rating', lookup_expr='lte')
+    ordering = StableOrderingFilter(
+        fields=('name', 'year', 'rating', 'id'))
 
     class Meta:
         model = Title
         fields = ('name', 'year', 'genre', 'category')
+
+    def filter_genre_match(self, queryset, name, value):
+        # Read by filter_genre
+        return queryset
+
+    def filter_category(self, queryset, name, value):
+        return queryset.filter(
+            category__in=Category.objects.filter(slug__in=value))
+
+    def filter_genre(self, queryset, name, value):
+        through = Title.genre.through.objects.filter(title=OuterRef('pk'))
+        if self.form.cleaned_data.get('genre_match') == ALL:
+            groups = [[slug] for slug in dict.fromkeys(value)]
+        else:
+            groups = [value]
+        for number, slugs in enumerate(groups):
+            # Django 2.2 filters on Exists only through an annotation
+            alias = f'_has_genre_{number}'
+            queryset = queryset.annotate(**{
+                alias: Exists(through.filter(genre__slug__in=slugs))
+            }).filter(**{alias: True})
+        return queryset
+
+
+class RankedSearchFilter(SearchFilter):
+    ''' SearchFilter that orders the matches by relevance.
+
+    On PostgreSQL the lookups are served by the pg_trgm GIN indexes
+    (migration 0006) and ranked by trigram similarity. Other databases
+    fall back to ranking exact and prefix matches first.
+    '''
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        search_fields = self.get_search_fields(view, request)
+        if not terms or not search_fields:
+            return queryset
+        queryset = super().filter_queryset(request, queryset, view)
+        field = search_fields[0]
+        term = ' '.join(terms)
+        if connections[queryset.db].vendor == 'postgresql':
+            rank = TrigramSimilarity(field, term)
+        else:
+            rank = Case(
+                When(**{f'{field}__iexact': term}, then=2),
+                When(**{f'{field}__istartswith': term}, then=1),
+                default=0,
+                output_field=IntegerField(),
+            )
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        return queryset.annotate(search_rank=rank).order_by(
+            '-search_rank', *ordering)
@@ -0,0 +1,150 @@
+import json
+import sys
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from rest_framework.test import APIRequestFactory
+
+from api.views import (CategoryViewSet, CommentViewSet, GenreViewSet,
+                       ReviewViewSet, TitleViewSet, UserViewSet)
+from reviews.models import Comment, Review, Title
+
+# Name, viewset, action, query string
+LIST_VIEWS = (
+    ('titles', TitleViewSet, 'list', ''),
+    ('titles_by_genre', TitleViewSet, 'list', 'genre={genre}'),
+    ('titles_by_category_year', TitleViewSet, 'list',
+     'category={category}&min_year=2000'),
+    ('title_detail', TitleViewSet, 'retrieve', ''),
+    ('titles_top', TitleViewSet, 'top', ''),
+    ('categories', CategoryViewSet, 'list', ''),
+    ('genres', GenreViewSet, 'list', ''),
+    ('reviews', ReviewViewSet, 'list', ''),
+    ('comments', CommentViewSet, 'list', ''),
+    ('users', UserViewSet, 'list', ''),
+)
+PG_SCAN_NODES = ('Seq Scan',)
+PG_SORT_NODES = ('Sort', 'Incremental Sort')
+
+
+class Command(BaseCommand):
+    help = ('Runs EXPLAIN on the page query of every viewset and flags '
+            'sequential scans and sorts over --min-rows rows')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-rows', type=int, default=1000)
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Print the whole plan of every query')
+        parser.add_argument(
+            '--fail', action='store_true',
+            help='Exit with status 1 when something is flagged')
+
+    def handle(self, *args, **options):
+        self.min_rows = options['min_rows']
+        comment = Comment.objects.order_by('pk').first()
+        review = comment.review if comment else Review.objects.first()
+        if review is None:
+            raise CommandError('The database has no reviews to audit')
+        title = Title.objects.filter(pk=review.title_id).first()
+        if title is None:
+            raise CommandError('The title of the first review is deleted')
+        params = {
+            'genre': title.genre.values_list('slug', flat=True).first(),
+            'category': title.category.slug if title.category else '',
+        }
+        kwargs = {
+            TitleViewSet: {'pk': title.pk},
+            ReviewViewSet: {'title_id': title.pk},
+            CommentViewSet: {'title_id': title.pk, 'review_id': review.pk},
+        }
+        findings = 0
+        for name, viewset, action, query in LIST_VIEWS:
+            queryset = self.get_page_queryset(
+                viewset, action, kwargs.get(viewset, {}),
+                query.format(**params))
+            connection = connections[queryset.db]
+            if connection.vendor == 'postgresql':
+                plan = queryset.explain(format='json')
+                flags = self.check_postgresql(json.loads(plan))
+            elif connection.vendor == 'sqlite':
+                plan = queryset.explain()
+                flags = self.check_sqlite(plan, connection)
+            else:
+                plan = queryset.explain()
+                flags = []
+            findings += len(flags)
+            status = self.style.WARNING('FLAG') if flags else 'ok'
+            self.stdout.write(f'{name:28} {status}')
+            for flag in flags:
+                self.stdout.write(f'    {flag}')
+            if options['verbose_plans']:
+                self.stdout.write(plan)
+        if findings and options['fail']:
+            sys.exit(1)
+
+    def get_page_queryset(self, viewset, action, kwargs, query):
+        ''' Builds the queryset the view would paginate, without running
+        permissions, pagination or the response cache '''
+        request = APIRequestFactory().get('/', data=None, QUERY_STRING=query)
+        request.user = AnonymousUser()
+        view = viewset(
+            action_map={'get': action}, args=(), kwargs=kwargs)
+        view.request = view.initialize_request(request)
+        view.format_kwarg = None
+        if action == 'retrieve':
+            lookup = view.lookup_url_kwarg or view.lookup_field
+            # get() drops the ordering
+            return view.filter_queryset(view.get_queryset()).filter(
+                **{view.lookup_field: kwargs[lookup]}).order_by()
+        if action == 'top':
+            return view.filter_queryset(
+                Title.objects.filter(ranking__isnull=False)
+            ).order_by('ranking__top_position')[:view.paginator.page_size]
+        queryset = view.filter_queryset(view.get_queryset())
+        page_size = view.paginator.page_size if view.paginator else None
+        return queryset[:page_size] if page_size else queryset
+
+    def check_postgresql(self, plan):
+        flags = []
+        nodes = [plan[0]['Plan']]
+        while nodes:
+            node = nodes.pop()
+            nodes.extend(node.get('Plans', ()))
+            rows = node.get('Plan Rows', 0)
+            if rows < self.min_rows:
+                continue
+            if node['Node Type'] in PG_SCAN_NODES:
+                flags.append(
+                    f'sequential scan on {node["Relation Name"]} '
+                    f'(~{rows} rows)')
+            elif node['Node Type'] in PG_SORT_NODES:
+                flags.append(
+                    f'sort of ~{rows} rows by '
+                    f'{", ".join(node.get("Sort Key", ()))}')
+        return flags
+
+    def check_sqlite(self, plan, connection):
+        ''' SQLite plans have no row estimates: scans are checked against
+        the table size (even when a LIMIT stops them early) and temporary
+        sorts are always flagged. Run ANALYZE first for realistic plans '''
+        flags = []
+        for line in plan.splitlines():
+            words = line.split()
+            if 'SCAN' in words and 'INDEX' not in words:
+                table = words[words.index('SCAN') + 1]
+                if table == 'TABLE':
+                    table = words[words.index('TABLE') + 1]
+                rows = self.count_rows(connection, table)
+                if rows >= self.min_rows:
+                    flags.append(f'full scan on {table} ({rows} rows)')
+            elif 'TEMP' in words and 'B-TREE' in words:
+                flags.append(' '.join(words[words.index('USE'):]))
+        return flags
+
+    def count_rows(self, connection, table):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+            return cursor.fetchone()[0]
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import get_stats
+
+
+class Command(BaseCommand):
+    help = 'Shows hit/miss counters of the response cache'
+
+    def handle(self, *args, **options):
+        stats = get_stats()
+        lookups = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / lookups if lookups else 0
+        self.stdout.write(
+            f"hits: {stats['hits']}, misses: {stats['misses']}, "
+            f'hit ratio: {ratio:.2%}')
@@ -0,0 +1,175 @@
+import cProfile
+import logging
+import os
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+from .db_routers import pin_to_primary, use_replica
+
+logger = logging.getLogger('api.timing')
+
+current_timing = ContextVar('current_timing', default=None)
+
+
+class RequestTiming:
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.view_name = None
+        self.view_started = None
+        self.view = 0.0
+        self.serializing = False
+        self.serialize = 0.0
+        self.render_started = None
+        self.render = 0.0
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - started
+            self.queries += 1
+
+    def start_render(self):
+        self.render_started = time.perf_counter()
+        if self.view_started is not None:
+            self.view = self.render_started - self.view_started
+
+    def finish_render(self, response):
+        self.render = time.perf_counter() - self.render_started
+
+
+@contextmanager
+def timed_serialization():
+    ''' Adds the time of the block to the timing of the current request;
+    nested blocks count once '''
+    timing = current_timing.get()
+    if timing is None or timing.serializing:
+        yield
+        return
+    timing.serializing = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.serialize += time.perf_counter() - started
+        timing.serializing = False
+
+
+def get_view_name(request, view_func):
+    ''' Returns names like TitleViewSet.list for DRF views '''
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return getattr(view_func, '__name__', repr(view_func))
+    method = request.method.lower()
+    action = (getattr(view_func, 'actions', None) or {}).get(method, method)
+    return f'{view_class.__name__}.{action}'
+
+
+class RequestTimingMiddleware:
+    ''' Measures DB queries, SQL time, view, serialization and render time
+    of each request.
+
+    `serialize` is the time spent in serializers with
+    TimedSerializerMixin and is not counted in `view`; `render` is
+    the JSON rendering of the response. The numbers go to the
+    Server-Timing header and to the `api.timing`
+    logger. With REQUEST_PROFILE_RATE > 0 that fraction of requests is
+    also run under cProfile and dumped to REQUEST_PROFILE_DIR.
+    '''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.REQUEST_TIMING:
+            return self.get_response(request)
+        timing = request.timing = RequestTiming()
+        token = current_timing.set(timing)
+        profiler = None
+        if random.random() < settings.REQUEST_PROFILE_RATE:
+            profiler = cProfile.Profile()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(timing.record_query))
+            if profiler is not None:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                current_timing.reset(token)
+        total = time.perf_counter() - started
+        if timing.render_started is None and timing.view_started is not None:
+            timing.view = total - (timing.view_started - started)
+        timing.view = max(timing.view - timing.serialize, 0.0)
+        view_name = timing.view_name or '-'
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={timing.sql * 1000:.2f};desc="{timing.queries} queries"',
+            f'view;dur={timing.view * 1000:.2f};desc="{view_name}"',
+            f'serialize;dur={timing.serialize * 1000:.2f}',
+            f'render;dur={timing.render * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ))
+        logger.info(
+            'view=%s method=%s path=%s status=%s queries=%s db_ms=%.2f '
+            'view_ms=%.2f serialize_ms=%.2f render_ms=%.2f total_ms=%.2f',
+            view_name, request.method, request.path, response.status_code,
+            timing.queries, timing.sql * 1000, timing.view * 1000,
+            timing.serialize * 1000, timing.render * 1000, total * 1000,
+        )
+        if profiler is not None:
+            self.dump_profile(profiler, view_name)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = getattr(request, 'timing', None)
+        if timing is not None:
+            timing.view_name = get_view_name(request, view_func)
+            timing.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Called right after the view, before the response is rendered.
+        timing = getattr(request, 'timing', None)
+        if timing is not None:
+            timing.start_render()
+            response.add_post_render_callback(timing.finish_render)
+        return response
+
+    def dump_profile(self, profiler, view_name):
+        os.makedirs(settings.REQUEST_PROFILE_DIR, exist_ok=True)
+        profiler.dump_stats(os.path.join(
+            settings.REQUEST_PROFILE_DIR,
+            f'{time.strftime("%Y%m%d-%H%M%S")}-{view_name}-'
+            f'{time.time_ns() % 10 ** 9}.prof'))
+
+
+class ReplicaRoutingMiddleware:
+    ''' Scopes replica routing to one request and pins users to the
+    primary after a successful write '''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = use_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replica.reset(token)
+        user = getattr(request, 'user', None)
+        if (request.method not in SAFE_METHODS
+                and response.status_code < 400
+                and user is not None and user.is_authenticated):
+            pin_to_primary(user)
+        return response
@@ -1,4 +1,84 @@
-from rest_framework import viewsets, mixins
+from hashlib import md5
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework import mixins, serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from .cache import (get_cached_response, get_generations,
+                    set_cached_response)
+from .db_routers import is_pinned, use_replica
+from .middleware import timed_serialization
+from .permissions import AdminLevelPermission
+
+
+class ReplicaReadMixin:
+    ''' Serves safe requests to `replica_actions` from read replicas.
+
+    The decision is taken after authentication, so users who wrote
+    recently (see ReplicaRoutingMiddleware) keep reading from the
+    primary.
+    '''
+    replica_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (request.method in SAFE_METHODS
+                and self.action in self.replica_actions
+                and not is_pinned(request.user)):
+            use_replica.set(True)
+
+
+class BulkCreateMixin:
+    ''' Adds admin-only `POST <prefix>/bulk/`, which creates a list of
+    objects with perform_bulk_create in one transaction.
+
+    When any item is invalid nothing is written and the response holds
+    one error dict per item, in the order of the payload. The route
+    shadows a detail lookup of `bulk`, so serializers of slug-addressed
+    objects reject that slug (see SlugNotReservedMixin).
+    '''
+
+    def perform_bulk_create(self, items):
+        raise NotImplementedError
+
+    def bulk_response(self, perform, success_status):
+        with transaction.atomic():
+            data, errors = perform(self.request.data)
+        if data is None:
+            return Response(
+                {'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data, status=success_status)
+
+    @action(detail=False, methods=['post'],
+            permission_classes=(AdminLevelPermission,))
+    def bulk(self, request):
+        return self.bulk_response(
+            self.perform_bulk_create, status.HTTP_201_CREATED)
+
+
+class BulkUpdateMixin(BulkCreateMixin):
+    ''' Same as BulkCreateMixin, plus `PATCH <prefix>/bulk/`, which
+    updates a list of objects with perform_bulk_update '''
+
+    def perform_bulk_update(self, items):
+        raise NotImplementedError
+
+    # A new action, so PATCH is not added to the route of BulkCreateMixin
+    @action(detail=False, methods=['post'],
+            permission_classes=(AdminLevelPermission,))
+    def bulk(self, request):
+        return super().bulk(request)
+
+    @bulk.mapping.patch
+    def bulk_update(self, request):
+        return self.bulk_response(
+            self.perform_bulk_update, status.HTTP_200_OK)
 
 
 class ListCreateDestroyViewSet(viewsets.GenericViewSet,
@@ -6,3 +86,226 @@ class ListCreateDestroyViewSet(viewsets.GenericViewSet,
                                mixins.ListModelMixin,
                                mixins.DestroyModelMixin):
     pass
+
+
+def get_field_list(request, param):
+    ''' Returns the comma separated names passed in a query parameter,
+    or None when it is missing or the request is not a read '''
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class TimedSerializerMixin:
+    ''' Counts to_representation, with the lazy queries it runs, as the
+    `serialize` part of the request timing (see RequestTimingMiddleware)
+    '''
+
+    def to_representation(self, instance):
+        with timed_serialization():
+            return super().to_representation(instance)
+
+
+class QueryPlanSerializerMixin:
+    ''' Declares related data the serializer renders.
+
+    Reads support sparse fieldsets: `?fields=id,name` renders only the
+    listed fields, and `?expand=` renders only the listed
+    `expandable_fields` as nested objects, collapsing the others to the
+    slug field they map to. setup_eager_loading plans the query for the
+    fields that are left, so skipped relations are not joined or
+    prefetched and only the needed columns are loaded.
+    '''
+    select_related_fields = ()
+    prefetch_related_fields = ()
+    expandable_fields = {}
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        fields = get_field_list(request, self.fields_query_param)
+        expand = get_field_list(request, self.expand_query_param)
+        self.is_sparse = fields is not None or expand is not None
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+        if expand is not None:
+            for name, slug_field in self.expandable_fields.items():
+                if name in self.fields and name not in expand:
+                    self.fields[name] = serializers.SlugRelatedField(
+                        slug_field=slug_field,
+                        many=isinstance(
+                            self.fields[name], serializers.ListSerializer),
+                        read_only=True,
+                    )
+
+    def get_only_fields(self):
+        ''' Returns the lookups to pass to only(), or None when a field
+        is not backed by a model field and nothing can be deferred '''
+        opts = self.Meta.model._meta
+        only_fields = [opts.pk.name]
+        for field in self.fields.values():
+            source = field.source.split('.')
+            try:
+                model_field = opts.get_field(source[0])
+            except FieldDoesNotExist:
+                return None
+            if model_field.many_to_many or model_field.one_to_many:
+                continue
+            if isinstance(field, serializers.SlugRelatedField):
+                source.append(field.slug_field)
+            only_fields.append('__'.join(source))
+        return only_fields
+
+    def setup_eager_loading(self, queryset):
+        opts = self.Meta.model._meta
+        sources = {
+            field.source.split('.')[0]: field
+            for field in self.fields.values()
+        }
+        select_related = [
+            lookup for lookup in self.select_related_fields
+            if lookup.split('__')[0] in sources
+        ]
+        prefetch_related = []
+        for lookup in self.prefetch_related_fields:
+            field = sources.get(lookup.split('__')[0])
+            if field is None:
+                continue
+            if isinstance(getattr(field, 'child_relation', None),
+                          serializers.SlugRelatedField):
+                related_model = opts.get_field(lookup).related_model
+                lookup = Prefetch(lookup, related_model.objects.only(
+                    'pk', field.child_relation.slug_field))
+            prefetch_related.append(lookup)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        if self.is_sparse:
+            only_fields = self.get_only_fields()
+            if only_fields is not None:
+                queryset = queryset.only(*only_fields)
+        return queryset
+
+
+class QueryPlanViewSetMixin:
+    ''' Applies the query plan of the serializer to list and detail
+    querysets, so nested data is fetched in a fixed number of queries '''
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if issubclass(serializer_class, QueryPlanSerializerMixin):
+            queryset = self.get_serializer().setup_eager_loading(queryset)
+        return queryset
+
+
+class ConditionalListMixin:
+    ''' Adds an ETag validator to list responses.
+
+    The ETag is built from the request path and the generation numbers
+    (see api/cache.py) of `conditional_models`: the resource and the
+    models rendered inside it or hiding it. Every write, delete included,
+    bumps the generation of its model, so a request with a matching
+    If-None-Match gets 304 without touching the database.
+    '''
+    conditional_models = ()
+
+    def get_conditional_models(self):
+        return self.conditional_models
+
+    def get_etag(self):
+        fingerprint = repr((
+            self.request.get_full_path(),
+            get_generations(self.get_conditional_models()),
+        ))
+        return quote_etag(md5(fingerprint.encode()).hexdigest())
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag = self.get_etag()
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
+
+
+class ConditionalGetMixin(ConditionalListMixin):
+    ''' Same as ConditionalListMixin, for detail responses as well '''
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
+
+
+class CachedListMixin:
+    ''' Caches list response data keyed by the request path and the
+    generation numbers of `cache_models`.
+
+    Any write to one of the models bumps its generation (see
+    api/signals.py), so stale entries are never read again and simply
+    age out of the cache. The ETag set by ConditionalListMixin is
+    cached with the data, so a hit answers conditional requests without
+    touching the database.
+
+    Misses are read from the primary even in `replica_actions`: the
+    entry is shared by every user until the next write, so a lagging
+    replica must not fill it.
+    '''
+    cache_models = ()
+    cached_headers = ('ETag',)
+
+    def get_cache_models(self):
+        return self.cache_models
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key, entry = get_cached_response(
+            request.get_full_path(), self.get_cache_models())
+        if entry is None:
+            token = use_replica.set(False)
+            try:
+                response = handler(request, *args, **kwargs)
+            finally:
+                use_replica.reset(token)
+            if response.status_code == 200:
+                set_cached_response(key, {
+                    'data': response.data,
+                    'headers': {
+                        header: response[header]
+                        for header in self.cached_headers
+                        if response.has_header(header)
+                    },
+                })
+                response['X-Cache'] = 'MISS'
+            return response
+        headers = entry['headers']
+        response = get_conditional_response(
+            request, etag=headers.get('ETag'))
+        if response is None:
+            response = Response(entry['data'])
+        for header, value in headers.items():
+            response[header] = value
+        response['X-Cache'] = 'HIT'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class CachedGetMixin(CachedListMixin):
+    ''' Same as CachedListMixin, for detail responses as well '''
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,113 @@
+from collections import OrderedDict
+
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class OptInCursorPagination(pagination.CursorPagination):
+    ''' Page-number pagination by default, keyset pagination on request.
+
+    Clients switch to cursors with `?pagination=cursor` and then follow
+    the opaque `next`/`previous` links, so a deep page costs the same as
+    the first one. Requests with `?page=` keep the page-number format.
+
+    A cursor walks the fixed `ordering`, so the query parameters listed
+    in `reordering_params` are refused in cursor mode with 400.
+    '''
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+    reordering_params = ()
+
+    def __init__(self):
+        self.page_number_pagination = pagination.PageNumberPagination()
+        self.use_cursor = False
+
+    def is_cursor_request(self, request):
+        params = request.query_params
+        if self.page_number_pagination.page_query_param in params:
+            return False
+        return (
+            self.cursor_query_param in params
+            or params.get(self.mode_query_param) == self.cursor_mode
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = self.is_cursor_request(request)
+        if not self.use_cursor:
+            return self.page_number_pagination.paginate_queryset(
+                queryset, request, view)
+        refused = [
+            param for param in self.reordering_params
+            if request.query_params.get(param)
+        ]
+        if refused:
+            raise ValidationError({
+                param: f'Not supported with '
+                       f'{self.mode_query_param}={self.cursor_mode}.'
+                for param in refused
+            })
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return self.page_number_pagination.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if not self.use_cursor:
+            return self.page_number_pagination.to_html()
+        return super().to_html()
+
+
+class TitleCursorPagination(OptInCursorPagination):
+    ordering = '-id'
+    # search results are ordered by relevance
+    reordering_params = ('ordering', api_settings.SEARCH_PARAM)
+
+
+class PubDateCursorPagination(OptInCursorPagination):
+    ordering = ('-pub_date', 'id')
+
+
+class RankingPagination(pagination.BasePagination):
+    ''' Page-number pagination without COUNT(*) for leaderboards.
+
+    The queryset is ordered by a stored position, so a page is an index
+    range scan; one extra row is fetched to know whether there is a
+    next page.
+    '''
+    page_size = pagination.PageNumberPagination.page_size
+    page_query_param = 'page'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.page_size:
+            return None
+        self.request = request
+        try:
+            self.page = pagination._positive_int(
+                request.query_params.get(self.page_query_param, 1),
+                strict=True)
+        except ValueError:
+            raise NotFound('Invalid page.')
+        offset = (self.page - 1) * self.page_size
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        return results[:self.page_size]
+
+    def get_page_link(self, page):
+        url = self.request.build_absolute_uri()
+        if page == 1:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, page)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_page_link(self.page + 1)
+             if self.has_next else None),
+            ('previous', self.get_page_link(self.page - 1)
+             if self.page > 1 else None),
+            ('results', data),
+        ]))
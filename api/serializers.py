@@ -1,7 +1,14 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import Lower
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
-from reviews.models import ROLES, Category, Comment, Genre, Review, Title, User
+from reviews.models import (ROLES, Category, Comment, Genre, OutgoingEmail,
+                            Review, Title, TitleStats, User)
+from .mixins import (QueryPlanSerializerMixin, TimedSerializerMixin,
+                     get_field_list)
 
 
 class CreateUserSerializer(serializers.ModelSerializer):
@@ -10,7 +17,9 @@ class CreateUserSerializer(serializers.ModelSerializer):
     def validate_email(self, value):
         '''Checks if the email is already in the database'''
         lower_email = value.lower()
-        if User.objects.filter(email__iexact=lower_email).exists():
+        # Matches the lower(email) index, unlike iexact (UPPER on PostgreSQL)
+        if User.objects.annotate(lower_email=Lower('email')).filter(
+                lower_email=lower_email).exists():
             raise serializers.ValidationError(
                 'This email address is already in use')
         return lower_email
@@ -24,10 +33,17 @@ class CreateUserSerializer(serializers.ModelSerializer):
         return lower_username
 
     def create(self, validated_data):
-        user = User.objects.create_user(
-            email=validated_data['email'],
-            username=validated_data['username'],
-        )
+        with transaction.atomic():
+            user = User.objects.create_user(
+                email=validated_data['email'],
+                username=validated_data['username'],
+            )
+            OutgoingEmail.objects.create(
+                subject='Confirmation code',
+                body=f'Your code: {user.confirmation_code}',
+                from_email=settings.ADMIN_EMAIL,
+                recipient=user.email,
+            )
         return user
 
     class Meta:
@@ -40,7 +56,7 @@ class GetJWTTokenSerializer(serializers.Serializer):
     confirmation_code = serializers.CharField(required=True)
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = User
@@ -49,7 +65,9 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ('role',)
 
 
-class UserNotInfoSerializer(serializers.ModelSerializer):
+class UserNotInfoSerializer(TimedSerializerMixin,
+                            QueryPlanSerializerMixin,
+                            serializers.ModelSerializer):
     username = serializers.CharField(
         required=True,
         validators=[UniqueValidator(queryset=User.objects.all())])
@@ -64,25 +82,44 @@ class UserNotInfoSerializer(serializers.ModelSerializer):
         optional_fields = ('first_name', 'last_name', 'bio', 'role')
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class SlugNotReservedMixin:
+    # Paths taken by list routes of the slug-addressed viewsets
+    reserved_slugs = ('bulk',)
+
+    def validate_slug(self, value):
+        ''' Assures that the slug does not shadow a list route '''
+        if value in self.reserved_slugs:
+            raise serializers.ValidationError('Please use a different slug')
+        return value
+
+
+class CategorySerializer(TimedSerializerMixin, SlugNotReservedMixin,
+                         serializers.ModelSerializer):
 
     class Meta:
         model = Category
-        exclude = ('id',)
+        exclude = ('id', 'updated_at')
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(TimedSerializerMixin, SlugNotReservedMixin,
+                      serializers.ModelSerializer):
 
     class Meta:
         model = Genre
-        exclude = ('id',)
+        exclude = ('id', 'updated_at')
 
 
-class TitleSerializer(serializers.ModelSerializer):
+class TitleSerializer(TimedSerializerMixin,
+                      QueryPlanSerializerMixin,
+                      serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     genre = GenreSerializer(many=True, read_only=True)
     rating = serializers.FloatField(read_only=True)
 
+    select_related_fields = ('category',)
+    prefetch_related_fields = ('genre',)
+    expandable_fields = {'category': 'slug', 'genre': 'slug'}
+
     class Meta:
         model = Title
         fields = (
@@ -91,7 +128,89 @@ class TitleSerializer(serializers.ModelSerializer):
         )
 
 
-class TitleCreateSerializer(serializers.ModelSerializer):
+class IncludedReviewSerializer(serializers.ModelSerializer):
+    author = serializers.SlugRelatedField(
+        slug_field='username',
+        read_only=True,
+    )
+    comment_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Review
+        fields = ('id', 'text', 'score', 'author', 'pub_date',
+                  'comment_count')
+
+
+class TitleStatsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    review_count = serializers.IntegerField(read_only=True)
+    scores = serializers.DictField(
+        child=serializers.IntegerField(), read_only=True)
+
+    class Meta:
+        model = TitleStats
+        fields = ('title', 'review_count', 'scores', 'first_review_at',
+                  'last_review_at')
+
+
+class TitleDetailSerializer(TitleSerializer):
+    ''' Title with the parts listed in `?include=`: its latest reviews
+    with comment counts (one query) and its TitleStats row (joined) '''
+    reviews = serializers.SerializerMethodField()
+    stats = serializers.SerializerMethodField()
+
+    include_query_param = 'include'
+
+    class Meta(TitleSerializer.Meta):
+        fields = TitleSerializer.Meta.fields + ('reviews', 'stats')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        include = get_field_list(
+            self.context.get('request'), self.include_query_param) or ()
+        for name in ('reviews', 'stats'):
+            if name not in include:
+                self.fields.pop(name, None)
+
+    def get_reviews(self, title):
+        reviews = (
+            Review.objects.filter(title_id=title.pk)
+            .select_related('author')
+            .annotate(comment_count=Count('comments'))
+            .order_by('-pub_date', 'id')[:settings.TITLE_INCLUDED_REVIEWS]
+        )
+        return IncludedReviewSerializer(reviews, many=True).data
+
+    def setup_eager_loading(self, queryset):
+        queryset = super().setup_eager_loading(queryset)
+        if 'stats' in self.fields:
+            queryset = queryset.select_related('stats')
+        return queryset
+
+    def get_stats(self, title):
+        stats = TitleStatsSerializer(TitleStats.for_title(title)).data
+        del stats['title']
+        stats['rating'] = title.rating
+        return stats
+
+
+class RankedTitleSerializer(TitleSerializer):
+    weighted_rating = serializers.FloatField(
+        source='ranking.weighted_rating', read_only=True)
+    trending_score = serializers.FloatField(
+        source='ranking.trending_score', read_only=True)
+    recent_reviews = serializers.IntegerField(
+        source='ranking.recent_reviews', read_only=True)
+
+    select_related_fields = ('category', 'ranking')
+
+    class Meta(TitleSerializer.Meta):
+        fields = TitleSerializer.Meta.fields + (
+            'weighted_rating', 'trending_score', 'recent_reviews')
+
+
+class TitleCreateSerializer(TimedSerializerMixin,
+                            QueryPlanSerializerMixin,
+                            serializers.ModelSerializer):
     category = serializers.SlugRelatedField(
         slug_field='slug',
         queryset=Category.objects.all()
@@ -102,6 +221,9 @@ class TitleCreateSerializer(serializers.ModelSerializer):
         many=True
     )
 
+    select_related_fields = ('category',)
+    prefetch_related_fields = ('genre',)
+
     class Meta:
         model = Title
         fields = (
@@ -110,40 +232,128 @@ class TitleCreateSerializer(serializers.ModelSerializer):
         )
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class CategoryBulkSerializer(
+                             SlugNotReservedMixin,
+                             serializers.ModelSerializer):
+
+    class Meta:
+        model = Category
+        fields = ('name', 'slug')
+        # Uniqueness is checked for the whole payload in api/bulk.py
+        extra_kwargs = {
+            'name': {'validators': []},
+            'slug': {'validators': []},
+        }
+
+
+class GenreBulkSerializer(CategoryBulkSerializer):
+
+    class Meta(CategoryBulkSerializer.Meta):
+        model = Genre
+
+
+class TitleBulkSerializer(serializers.ModelSerializer):
+    category = serializers.SlugField()
+    genre = serializers.ListField(child=serializers.SlugField())
+
+    class Meta:
+        model = Title
+        fields = ('name', 'year', 'description', 'genre', 'category')
+
+
+class TitleBulkUpdateSerializer(TitleBulkSerializer):
+    id = serializers.IntegerField()
+
+    class Meta(TitleBulkSerializer.Meta):
+        fields = ('id',) + TitleBulkSerializer.Meta.fields
+
+    def validate(self, attrs):
+        # Partial validation skips required fields, the id included
+        if 'id' not in attrs:
+            raise serializers.ValidationError(
+                {'id': 'This field is required.'})
+        return attrs
+
+
+class ReviewSerializer(TimedSerializerMixin,
+                       QueryPlanSerializerMixin,
+                       serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         slug_field='username',
         read_only=True,
     )
 
-    def validate(self, data):
-        if self.context['request'].method != 'POST':
-            return data
-        title = self.context['view'].kwargs['title_id']
-        author = self.context['request'].user
-        if author.reviews.filter(title=title).exists():
-            raise serializers.ValidationError(
-                'You can not leave more than 1 review.'
-            )
-        return data
+    select_related_fields = ('author',)
 
     class Meta:
         model = Review
         fields = ('id', 'text', 'score', 'author', 'pub_date')
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin,
+                        QueryPlanSerializerMixin,
+                        serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         slug_field='username',
         read_only=True
     )
 
+    select_related_fields = ('author',)
+
+    class Meta:
+        exclude = ('review', 'updated_at')
+        model = Comment
+
+
+class CategoryChangeSerializer(TimedSerializerMixin,
+                               serializers.ModelSerializer):
+
+    class Meta:
+        model = Category
+        fields = ('id', 'name', 'slug')
+
+
+class GenreChangeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+
+    class Meta:
+        model = Genre
+        fields = ('id', 'name', 'slug')
+
+
+class TitleChangeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    category = serializers.SlugRelatedField(
+        slug_field='slug', read_only=True)
+    genre = serializers.SlugRelatedField(
+        slug_field='slug', many=True, read_only=True)
+
+    class Meta:
+        model = Title
+        fields = ('id', 'name', 'year', 'rating', 'description', 'genre',
+                  'category')
+
+
+class ReviewChangeSerializer(TimedSerializerMixin,
+                             serializers.ModelSerializer):
+    author = serializers.SlugRelatedField(
+        slug_field='username', read_only=True)
+
+    class Meta:
+        model = Review
+        fields = ('id', 'title', 'text', 'score', 'author', 'pub_date')
+
+
+class CommentChangeSerializer(TimedSerializerMixin,
+                              serializers.ModelSerializer):
+    author = serializers.SlugRelatedField(
+        slug_field='username', read_only=True)
+
     class Meta:
-        exclude = ('review',)
         model = Comment
+        fields = ('id', 'review', 'text', 'author', 'pub_date')
 
 
-class UserWithAdminAccessSerializer(serializers.ModelSerializer):
+class UserWithAdminAccessSerializer(TimedSerializerMixin,
+                                    serializers.ModelSerializer):
     role = serializers.ChoiceField(choices=ROLES)
 
     class Meta:
@@ -0,0 +1,113 @@
+import time
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from reviews.changes import log_changes
+from reviews.models import (Category, ChangeLog, Comment, Genre, Review,
+                            Title, User)
+from reviews.ratings import ratings_rebuilt, stats_rebuilt
+from .authentication import bump_user_version
+from .cache import bump_generation
+
+
+def bump_after_commit(model):
+    transaction.on_commit(lambda: bump_generation(model))
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_catalog(sender, **kwargs):
+    bump_after_commit(sender)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def invalidate_title_genres(sender, **kwargs):
+    bump_after_commit(Title)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(ratings_rebuilt, sender=Title)
+@receiver(stats_rebuilt, sender=Title)
+def invalidate_title_ratings(sender, **kwargs):
+    bump_after_commit(Title)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_reviews(sender, **kwargs):
+    bump_after_commit(sender)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: bump_user_version(user_id))
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comment)
+def log_saved(sender, instance, created, **kwargs):
+    # Soft-deleted titles are tombstones for the clients
+    if getattr(instance, 'deleted_at', None) is not None:
+        action = ChangeLog.DELETE
+    else:
+        action = ChangeLog.CREATE if created else ChangeLog.UPDATE
+    log_changes(sender, [instance.pk], action)
+    if sender is Review:
+        log_changes(Title, [instance.title_id], ChangeLog.UPDATE)
+
+
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Comment)
+def log_deleted(sender, instance, **kwargs):
+    log_changes(sender, [instance.pk], ChangeLog.DELETE)
+    if sender is Review:
+        log_changes(Title, [instance.title_id], ChangeLog.UPDATE)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def log_title_genres(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    title_ids = (pk_set or ()) if reverse else [instance.pk]
+    log_changes(Title, title_ids, ChangeLog.UPDATE)
+
+
+@receiver(ratings_rebuilt, sender=Title)
+def log_rebuilt_ratings(sender, queryset, **kwargs):
+    log_changes(
+        Title, queryset.values_list('pk', flat=True), ChangeLog.UPDATE)
+
+
+@receiver(request_started)
+def check_connections(sender, **kwargs):
+    ''' Closes persistent connections that stopped working while idle,
+    so the request opens a new one instead of failing '''
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        checked_at = getattr(connection, 'health_checked_at', 0)
+        if now - checked_at < settings.DB_HEALTH_CHECK_INTERVAL:
+            continue
+        connection.health_checked_at = now
+        if not connection.is_usable():
+            connection.close()
@@ -4,7 +4,8 @@ from rest_framework.routers import SimpleRouter
 
 from .views import (TitleViewSet, CategoryViewSet, GenreViewSet,
                     RegisterNewUserAPIView, CustomJWTTokenView, UserViewSet,
-                    ReviewViewSet, CommentViewSet)
+                    ReviewViewSet, CommentViewSet, TitleExportAPIView,
+                    ReviewExportAPIView, ChangesAPIView)
 
 
 app_name = 'api'
@@ -25,4 +26,7 @@ urlpatterns = [
     path('v1/', include(router.urls)),
     path('v1/auth/signup/', RegisterNewUserAPIView.as_view()),
     path('v1/auth/token/', CustomJWTTokenView.as_view()),
+    path('v1/export/titles/', TitleExportAPIView.as_view()),
+    path('v1/export/reviews/', ReviewExportAPIView.as_view()),
+    path('v1/changes/', ChangesAPIView.as_view()),
 ]
@@ -1,23 +1,43 @@
+from datetime import datetime, time, timedelta
+
 from django.conf import settings
-from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import (filters, generics, permissions, status,
-                            viewsets, exceptions)
+from rest_framework import (generics, permissions, status, viewsets,
+                            exceptions)
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework_simplejwt.tokens import SlidingToken
 
-from reviews.models import Category, Genre, Review, Title, User
-from .filters import TitleFilter
-from .mixins import ListCreateDestroyViewSet
+from reviews.changes import committed_entries
+from reviews.models import (Category, ChangeLog, Comment, Genre, Review,
+                            Title, TitleStats, User)
+from reviews.ratings import update_title_rating, update_title_stats
+from .bulk import (bulk_create_categories, bulk_create_genres,
+                   bulk_create_titles, bulk_update_titles)
+from .changes import build_delta
+from .export import (REVIEW_COLUMNS, TITLE_COLUMNS, iter_review_rows,
+                     iter_title_rows, render_csv, render_ndjson)
+from .filters import RankedSearchFilter, TitleFilter
+from .mixins import (BulkCreateMixin, BulkUpdateMixin, CachedGetMixin,
+                     CachedListMixin, ConditionalGetMixin,
+                     ConditionalListMixin, ListCreateDestroyViewSet,
+                     QueryPlanViewSetMixin, ReplicaReadMixin, get_field_list)
+from .pagination import (PubDateCursorPagination, RankingPagination,
+                         TitleCursorPagination)
 from .permissions import (AdminLevelOrReadOnlyPermission, AdminLevelPermission,
                           IsOwnerAdminModeratorOrReadOnly)
 from .serializers import (CategorySerializer, CommentSerializer,
                           CreateUserSerializer, GenreSerializer,
-                          GetJWTTokenSerializer, ReviewSerializer,
-                          TitleCreateSerializer, TitleSerializer,
+                          GetJWTTokenSerializer, RankedTitleSerializer,
+                          ReviewSerializer, TitleCreateSerializer,
+                          TitleDetailSerializer, TitleSerializer,
+                          TitleStatsSerializer,
                           UserNotInfoSerializer, UserSerializer,
                           UserWithAdminAccessSerializer)
 
@@ -29,12 +49,7 @@ class RegisterNewUserAPIView(generics.CreateAPIView):
     def post(self, request):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
-        user = serializer.save()
-        token = user.confirmation_code
-        send_mail(
-            'Confirmation code', f'Your code: {token}', settings.ADMIN_EMAIL,
-            [user.email],
-            fail_silently=False,)
+        serializer.save()
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -46,15 +61,15 @@ class CustomJWTTokenView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         v_data = serializer.validated_data
         user = get_object_or_404(
-            User, username=v_data['username'])
+            User, username=v_data['username'], deleted_at__isnull=True)
         if user.confirmation_code != v_data['confirmation_code']:
             raise exceptions.ValidationError()
         token = SlidingToken.for_user(user)
         return Response({'Token': str(token)}, status.HTTP_200_OK)
 
 
-class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all()
+class UserViewSet(QueryPlanViewSetMixin, viewsets.ModelViewSet):
+    queryset = User.objects.filter(deleted_at__isnull=True)
     serializer_class = UserNotInfoSerializer
     permission_classes = (AdminLevelPermission,)
     lookup_field = 'username'
@@ -62,7 +77,7 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(methods=['get', 'patch'],
             detail=False, permission_classes=(permissions.IsAuthenticated,))
     def me(self, request, *args, **kwargs):
-        user = get_object_or_404(User, username=request.user.username)
+        user = request.user
         if request.method == 'GET':
             serializer = UserSerializer(user, many=False)
             return Response(serializer.data)
@@ -77,76 +92,359 @@ class UserViewSet(viewsets.ModelViewSet):
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
 
+    def perform_destroy(self, instance):
+        instance.soft_delete()
+
 
-class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')
-    ).order_by('-id')
-    filter_backends = (DjangoFilterBackend,)
+class TitleViewSet(ReplicaReadMixin, BulkUpdateMixin, CachedGetMixin,
+                   ConditionalGetMixin, QueryPlanViewSetMixin,
+                   viewsets.ModelViewSet):
+    queryset = Title.objects.order_by('-id')
+    pagination_class = TitleCursorPagination
+    filter_backends = (DjangoFilterBackend, RankedSearchFilter)
     permission_classes = (AdminLevelOrReadOnlyPermission,)
     filterset_class = TitleFilter
+    search_fields = ('name',)
     filterset_fields = ['category', 'genre', 'year', 'name']
+    cache_models = (Title, Category, Genre)
+    replica_actions = ('list', 'retrieve', 'top', 'trending', 'stats',
+                       'bulk_stats')
 
     def get_serializer_class(self):
+        if self.action in ('top', 'trending'):
+            return RankedTitleSerializer
+        if self.action == 'retrieve':
+            return TitleDetailSerializer
         if self.request.method in ['GET']:
             return TitleSerializer
         return TitleCreateSerializer
 
+    def includes_reviews(self):
+        include = get_field_list(
+            self.request, TitleDetailSerializer.include_query_param)
+        return self.action == 'retrieve' and 'reviews' in (include or ())
+
+    def get_cache_models(self):
+        # Embedded reviews carry comment counts
+        if self.includes_reviews():
+            return self.cache_models + (Comment,)
+        return self.cache_models
+
+    def get_conditional_models(self):
+        return self.get_cache_models()
+
+    def perform_destroy(self, instance):
+        instance.soft_delete()
+
+    def perform_bulk_create(self, items):
+        return bulk_create_titles(items)
+
+    def perform_bulk_update(self, items):
+        return bulk_update_titles(items)
+
+    def ranked_list(self, position_field):
+        ''' Lists titles in the order precomputed by refresh_rankings;
+        the category/genre filters of TitleFilter apply '''
+        queryset = self.filter_queryset(
+            Title.objects.filter(ranking__isnull=False)
+        ).order_by(f'ranking__{position_field}')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, filter_backends=(DjangoFilterBackend,),
+            pagination_class=RankingPagination)
+    def top(self, request):
+        return self.ranked_list('top_position')
+
+    @action(detail=False, filter_backends=(DjangoFilterBackend,),
+            pagination_class=RankingPagination)
+    def trending(self, request):
+        return self.ranked_list('trending_position')
 
-class CategoryViewSet(viewsets.ModelViewSet):
+    @action(detail=True)
+    def stats(self, request, pk=None):
+        title = generics.get_object_or_404(
+            Title.objects.select_related('stats').only('id', 'stats'), pk=pk)
+        return Response(
+            TitleStatsSerializer(TitleStats.for_title(title)).data)
+
+    @action(detail=False, url_path='stats')
+    def bulk_stats(self, request):
+        ''' Stats of the titles in `?ids=1,2,3`; unknown ids are left out '''
+        ids = get_field_list(request, 'ids')
+        try:
+            ids = {int(title_id) for title_id in ids or ()}
+        except ValueError:
+            ids = None
+        if not ids:
+            raise exceptions.ValidationError(
+                {'ids': 'Expected a comma separated list of title ids.'})
+        if len(ids) > settings.TITLE_STATS_MAX_IDS:
+            raise exceptions.ValidationError({'ids': (
+                f'Expected at most {settings.TITLE_STATS_MAX_IDS} ids.')})
+        titles = (
+            Title.objects.filter(pk__in=ids).select_related('stats')
+            .only('id', 'stats').order_by('id')
+        )
+        serializer = TitleStatsSerializer(
+            [TitleStats.for_title(title) for title in titles], many=True)
+        return Response(serializer.data)
+
+
+class CategoryViewSet(ReplicaReadMixin, BulkCreateMixin, CachedGetMixin,
+                      ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
+    cache_models = conditional_models = (Category,)
     serializer_class = CategorySerializer
     lookup_field = 'slug'
     lookup_url_kwarg = 'slug'
-    filter_backends = (filters.SearchFilter,)
+    filter_backends = (RankedSearchFilter,)
     search_fields = ('name',)
     permission_classes = (AdminLevelOrReadOnlyPermission,)
 
     def update(self, request, *args, **kwargs):
         return Response(status=status.HTTP_404_NOT_FOUND)
 
+    def perform_bulk_create(self, items):
+        return bulk_create_categories(items)
+
 
-class GenreViewSet(ListCreateDestroyViewSet):
+class GenreViewSet(ReplicaReadMixin, BulkCreateMixin, CachedListMixin,
+                   ConditionalListMixin, ListCreateDestroyViewSet):
     queryset = Genre.objects.all()
+    cache_models = conditional_models = (Genre,)
     serializer_class = GenreSerializer
     lookup_field = 'slug'
-    filter_backends = (filters.SearchFilter,)
+    filter_backends = (RankedSearchFilter,)
     search_fields = ('name',)
     permission_classes = (AdminLevelOrReadOnlyPermission,)
 
+    def perform_bulk_create(self, items):
+        return bulk_create_genres(items)
+
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ReplicaReadMixin, ConditionalGetMixin,
+                    QueryPlanViewSetMixin, viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = (IsOwnerAdminModeratorOrReadOnly,)
+    pagination_class = PubDateCursorPagination
+    # Soft-deleting the title hides its reviews
+    conditional_models = (Review, Title)
+    replica_actions = ('list',)
     http_method_names = ['get', 'post', 'patch', 'delete']
 
+    def get_title(self):
+        ''' Resolves the parent title once per request '''
+        if not hasattr(self, '_title'):
+            self._title = get_object_or_404(
+                Title.objects.only('id'), id=self.kwargs.get('title_id'))
+        return self._title
+
     def get_queryset(self):
-        title_id = self.kwargs.get('title_id')
-        title = get_object_or_404(Title, id=title_id)
-        return title.reviews.all()
+        # Detail lookups are scoped by the title and 404 on their own,
+        # soft-deleted titles included; lists need the parent check to
+        # tell a missing title from an empty one.
+        if self.action == 'list':
+            self.get_title()
+        return Review.objects.filter(
+            title_id=self.kwargs.get('title_id'),
+            title__deleted_at__isnull=True,
+        )
 
     def perform_create(self, serializer):
-        title_id = self.kwargs.get('title_id')
-        title = get_object_or_404(Title, id=title_id)
-        serializer.save(author=self.request.user, title=title)
+        try:
+            with transaction.atomic():
+                review = serializer.save(
+                    author=self.request.user, title=self.get_title())
+                update_title_rating(
+                    review.title_id, count_delta=1, score_delta=review.score)
+                update_title_stats(
+                    review.title_id, score=review.score,
+                    pub_date=review.pub_date)
+        except IntegrityError:
+            # unique_review constraint: one review per author and title
+            raise exceptions.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'You can not leave more than 1 review.'],
+            })
+
+    def perform_update(self, serializer):
+        old_score = serializer.instance.score
+        with transaction.atomic():
+            review = serializer.save()
+            update_title_rating(
+                review.title_id, score_delta=review.score - old_score)
+            if review.score != old_score:
+                update_title_stats(
+                    review.title_id, score=review.score, old_score=old_score)
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            update_title_rating(
+                instance.title_id, count_delta=-1,
+                score_delta=-instance.score)
+            update_title_stats(instance.title_id, old_score=instance.score)
 
-class CommentViewSet(viewsets.ModelViewSet):
+
+class CommentViewSet(ReplicaReadMixin, ConditionalGetMixin,
+                     QueryPlanViewSetMixin, viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = (IsOwnerAdminModeratorOrReadOnly,)
+    pagination_class = PubDateCursorPagination
+    conditional_models = (Comment, Review, Title)
+    replica_actions = ('list',)
     http_method_names = ('get', 'post', 'patch', 'delete')
 
+    def get_review(self):
+        ''' Resolves the parent review once per request '''
+        if not hasattr(self, '_review'):
+            self._review = get_object_or_404(
+                Review.objects.only('id'),
+                id=self.kwargs.get('review_id'),
+                title_id=self.kwargs.get('title_id'),
+                title__deleted_at__isnull=True,
+            )
+        return self._review
+
     def get_queryset(self):
-        title_id = self.kwargs.get('title_id')
-        review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(Review, id=review_id, title=title_id)
-        return review.comments.all()
+        if self.action == 'list':
+            self.get_review()
+        return Comment.objects.filter(
+            review_id=self.kwargs.get('review_id'),
+            review__title_id=self.kwargs.get('title_id'),
+            review__title__deleted_at__isnull=True,
+        )
 
     def perform_create(self, serializer):
-        title_id = self.kwargs.get('title_id')
-        review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(Review, id=review_id, title=title_id)
-        serializer.save(
-            author=self.request.user,
-            review=review
-        )
+        serializer.save(author=self.request.user, review=self.get_review())
+
+
+class ExportAPIView(generics.GenericAPIView):
+    ''' Streams a whole table as NDJSON or CSV.
+
+    `?output=ndjson|csv` picks the format, `?since=<ISO date or datetime>`
+    limits the export to rows changed since then.
+    '''
+    permission_classes = (AdminLevelPermission,)
+    pagination_class = None
+    export_name = None
+    columns = ()
+
+    def get_rows(self, queryset):
+        raise NotImplementedError
+
+    def filter_since(self, queryset):
+        since = self.request.query_params.get('since')
+        if since is None:
+            return queryset
+        try:
+            value = parse_datetime(since)
+            if value is None and parse_date(since) is not None:
+                value = datetime.combine(parse_date(since), time.min)
+        except ValueError:
+            value = None
+        if value is None:
+            raise exceptions.ValidationError(
+                {'since': 'Expected an ISO 8601 date or datetime.'})
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return queryset.filter(updated_at__gte=value)
+
+    def get(self, request):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in ('ndjson', 'csv'):
+            raise exceptions.ValidationError(
+                {'output': 'Expected ndjson or csv.'})
+        queryset = self.filter_since(self.get_queryset()).order_by('id')
+        rows = self.get_rows(queryset)
+        if output == 'csv':
+            content = render_csv(rows, self.columns)
+            content_type = 'text/csv; charset=utf-8'
+        else:
+            content = render_ndjson(rows)
+            content_type = 'application/x-ndjson; charset=utf-8'
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="{self.export_name}.{output}"')
+        return response
+
+
+class TitleExportAPIView(ExportAPIView):
+    queryset = Title.objects.all()
+    export_name = 'titles'
+    columns = TITLE_COLUMNS
+
+    def get_rows(self, queryset):
+        return iter_title_rows(queryset, settings.EXPORT_CHUNK_SIZE)
+
+
+class ReviewExportAPIView(ExportAPIView):
+    queryset = Review.objects.filter(title__deleted_at__isnull=True)
+    export_name = 'reviews'
+    columns = REVIEW_COLUMNS
+
+    def get_rows(self, queryset):
+        return iter_review_rows(queryset, settings.EXPORT_CHUNK_SIZE)
+
+
+class ChangesAPIView(generics.GenericAPIView):
+    ''' Changes of titles, categories, genres, reviews and comments.
+
+    `?since=<seq>` returns up to CHANGES_BATCH_SIZE change log entries
+    after `since`, collapsed per object, and `next`: the seq to pass as
+    `since` in the next request while `has_more` is true. Without
+    `since` only `next` is returned; a client takes it before a full
+    download and syncs from it afterwards. A `since` older than the
+    retained log gets 410 Gone with the current seq.
+
+    `next` never passes a missing seq younger than CHANGES_GAP_TIMEOUT:
+    its transaction may commit after the entries that follow it.
+    '''
+    permission_classes = (permissions.AllowAny,)
+    pagination_class = None
+
+    def get_committed_seq(self):
+        ''' The last seq that no running transaction can precede '''
+        timeout = settings.CHANGES_GAP_TIMEOUT
+        settled = ChangeLog.objects.filter(
+            created_at__lte=timezone.now() - timedelta(seconds=timeout),
+        ).order_by('-seq').values_list('seq', flat=True).first()
+        if settled is None:
+            oldest = ChangeLog.objects.values_list('seq', flat=True).first()
+            settled = oldest - 1 if oldest is not None else 0
+        recent, _ = committed_entries(
+            list(ChangeLog.objects.filter(seq__gt=settled)
+                 .only('seq', 'created_at')),
+            settled, timeout)
+        return recent[-1].seq if recent else settled
+
+    def get(self, request):
+        since = request.query_params.get('since')
+        if since is None:
+            return Response({'next': self.get_committed_seq()})
+        try:
+            since = int(since)
+        except ValueError:
+            since = -1
+        if since < 0:
+            raise exceptions.ValidationError(
+                {'since': 'Expected a change number.'})
+        oldest = ChangeLog.objects.values_list('seq', flat=True).first()
+        if oldest is not None and since < oldest - 1:
+            return Response(
+                {'detail': 'Changes after this seq have been pruned.',
+                 'next': self.get_committed_seq()},
+                status=status.HTTP_410_GONE)
+        entries = list(ChangeLog.objects.filter(
+            seq__gt=since)[:settings.CHANGES_BATCH_SIZE + 1])
+        has_more = len(entries) > settings.CHANGES_BATCH_SIZE
+        entries, held = committed_entries(
+            entries[:settings.CHANGES_BATCH_SIZE], since,
+            settings.CHANGES_GAP_TIMEOUT)
+        return Response({
+            'next': entries[-1].seq if entries else since,
+            'has_more': has_more and not held,
+            **build_delta(entries),
+        })
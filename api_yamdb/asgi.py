@@ -1,7 +1,140 @@
+''' ASGI entry point.
+
+Django 2.2 has neither an ASGI handler nor async views, so the WSGI
+application is served through asgiref's WsgiToAsgi from a bounded pool
+of ASGI_THREADS threads. The event loop reads request bodies and sends
+responses, so slow clients do not hold a thread (and its database
+connection) while the catalog reads stay synchronous views. Streaming
+responses (exports) keep their thread until the last chunk, since their
+cursor belongs to it. Bodies over ASGI_MAX_BODY_SIZE bytes get 413.
+
+The container serves it with uvicorn workers under gunicorn when started
+with SERVER_MODE=asgi (see entrypoint.sh):
+
+    gunicorn api_yamdb.asgi:application -c python:api_yamdb.gunicorn_conf \
+        -k uvicorn.workers.UvicornWorker
+'''
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-from django.core.asgi import get_asgi_application
+from asgiref import wsgi
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
 
-application = get_asgi_application()
+
+class RequestTooLarge(Exception):
+    pass
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class WsgiToAsgiInstance(wsgi.WsgiToAsgiInstance):
+    ''' One request of WsgiToAsgi '''
+
+    def __init__(self, adapter):
+        super().__init__(adapter.wsgi_application)
+        self.executor = adapter.executor
+        self.max_body_size = adapter.max_body_size
+
+    async def __call__(self, scope, receive, send):
+        received = 0
+
+        async def receive_limited():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                raise ClientDisconnected
+            received += len(message.get('body', b''))
+            if received > self.max_body_size:
+                raise RequestTooLarge
+            return message
+
+        try:
+            if self.content_length(scope) > self.max_body_size:
+                raise RequestTooLarge
+            await super().__call__(scope, receive_limited, send)
+        except RequestTooLarge:
+            await send({'type': 'http.response.start', 'status': 413,
+                        'headers': [(b'content-length', b'0')]})
+            await send({'type': 'http.response.body'})
+        except ClientDisconnected:
+            pass
+
+    def content_length(self, scope):
+        for name, value in scope.get('headers', ()):
+            if name == b'content-length' and value.isdigit():
+                return int(value)
+        return 0
+
+    def build_environ(self, scope, body):
+        environ = super().build_environ(scope, body)
+        # Repeated Cookie headers are joined with '; ', not ','
+        cookies = [
+            value.decode('latin1')
+            for name, value in scope.get('headers', ()) if name == b'cookie'
+        ]
+        if len(cookies) > 1:
+            environ['HTTP_COOKIE'] = '; '.join(cookies)
+        return environ
+
+    async def run_wsgi_app(self, body):
+        await sync_to_async(
+            self.run, thread_sensitive=False, executor=self.executor)(body)
+
+    def run(self, body):
+        ''' Runs the request in a pool thread and sends the response '''
+        environ = self.build_environ(self.scope, body)
+        iterable = self.wsgi_application(environ, self.start_response)
+        try:
+            for chunk in iterable:
+                if not self.response_started:
+                    self.response_started = True
+                    self.sync_send(self.response_start)
+                if chunk:
+                    self.sync_send({'type': 'http.response.body',
+                                    'body': chunk, 'more_body': True})
+            if not self.response_started:
+                self.response_started = True
+                self.sync_send(self.response_start)
+            self.sync_send({'type': 'http.response.body'})
+        finally:
+            # Sends request_finished: Django releases the connections
+            if hasattr(iterable, 'close'):
+                iterable.close()
+
+
+class WsgiToAsgi(wsgi.WsgiToAsgi):
+    ''' asgiref's adapter run from a pool of `threads` threads, with
+    lifespan support '''
+
+    def __init__(self, wsgi_application, threads, max_body_size):
+        super().__init__(wsgi_application)
+        self.executor = ThreadPoolExecutor(
+            threads, thread_name_prefix='asgi')
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        await WsgiToAsgiInstance(self)(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+application = WsgiToAsgi(
+    get_wsgi_application(), settings.ASGI_THREADS,
+    settings.ASGI_MAX_BODY_SIZE)
@@ -0,0 +1,40 @@
+''' Gunicorn settings, selected with
+`gunicorn -c python:api_yamdb.gunicorn_conf api_yamdb.wsgi:application`.
+
+Every worker thread keeps its own database connection for CONN_MAX_AGE
+seconds, so the server holds up to workers * threads connections:
+keep it below max_connections of PostgreSQL (or put PgBouncer in front).
+'''
+import multiprocessing
+import os
+
+from django.conf import settings
+
+# settings are read lazily, on the first attribute access below
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv(
+    'GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+if not settings.CACHE_IS_SHARED:
+    # A per-process cache (locmem) would go stale in every other worker
+    workers = 1
+# gthread serves slow clients without a process each; gevent would also
+# need psycopg2 patched with psycogreen, which is not installed.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+preload_app = True
+# Recycle workers now and then, at different moments
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = timeout
+keepalive = 5
+worker_tmp_dir = '/dev/shm'
+accesslog = '-'
+
+
+def post_fork(server, worker):
+    # Connections opened while the app was preloaded belong to the master
+    from django.db import connections
+    connections.close_all()
@@ -23,10 +23,15 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt',
     'django_filters',
     'reviews',
-    'api',
+    'api.apps.ApiConfig',
 ]
 
+# Management commands of the benchmark suite; off in production
+if os.getenv('BENCHMARKS', 'false').lower() == 'true':
+    INSTALLED_APPS.append('benchmarks')
+
 MIDDLEWARE = [
+    'api.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -34,6 +39,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'api_yamdb.urls'
@@ -57,6 +63,12 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
+# Threads that run requests served by api_yamdb.asgi (one DB connection
+# each)
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 8))
+# Larger request bodies are refused with 413 before a thread is taken
+ASGI_MAX_BODY_SIZE = int(os.getenv('ASGI_MAX_BODY_SIZE', 10 * 1024 * 1024))
+
 
 DATABASES = {
     'default': {
@@ -65,9 +77,93 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT')
+        'PORT': os.getenv('DB_PORT'),
+        # Seconds a connection is reused between requests, 0 to close it
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+    }
+}
+
+# Persistent connections idle for longer are pinged when a request
+# starts and reopened if the server dropped them (0: every request)
+DB_HEALTH_CHECK_INTERVAL = int(os.getenv('DB_HEALTH_CHECK_INTERVAL', 0))
+
+# Read replicas: comma separated hosts, exposed as replica_1, replica_2...
+for number, host in enumerate(
+        filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['api.db_routers.ReplicaRouter']
+
+# Seconds a user keeps reading from the primary after a write
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+
+
+# Response generations, cached users and replica pins are bumped by
+# whichever worker handles the write, so several server processes need a
+# shared cache: CACHE_BACKEND=django_redis.cache.RedisCache and
+# CACHE_LOCATION=redis://<host>:6379/1. The default locmem cache is
+# per-process; gunicorn_conf then starts a single worker.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
+if CACHES['default']['BACKEND'].endswith('LocMemCache'):
+    # locmem evicts least recently used entries once MAX_ENTRIES is reached;
+    # redis is bounded by its own memory limit and LRU policy
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000)),
+    }
+elif CACHES['default']['BACKEND'].startswith('django_redis'):
+    # An unreachable redis is a cache miss, not a failed request
+    CACHES['default']['OPTIONS'] = {'IGNORE_EXCEPTIONS': True}
+    DJANGO_REDIS_LOG_IGNORED_EXCEPTIONS = True
+CACHE_IS_SHARED = not CACHES['default']['BACKEND'].endswith(
+    ('LocMemCache', 'DummyCache'))
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 300))
+
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', 300))
+
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
+# Reviews embedded by GET /titles/{id}/?include=reviews
+TITLE_INCLUDED_REVIEWS = int(os.getenv('TITLE_INCLUDED_REVIEWS', 10))
+# Titles per GET /titles/stats/?ids=
+TITLE_STATS_MAX_IDS = int(os.getenv('TITLE_STATS_MAX_IDS', 100))
+STATS_REBUILD_BATCH_SIZE = int(os.getenv('STATS_REBUILD_BATCH_SIZE', 1000))
+
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', 5000))
+BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', 500))
+
+REQUEST_TIMING = os.getenv('REQUEST_TIMING', 'false').lower() == 'true'
+REQUEST_PROFILE_RATE = float(os.getenv('REQUEST_PROFILE_RATE', 0))
+REQUEST_PROFILE_DIR = os.getenv(
+    'REQUEST_PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.timing': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_TIMING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -90,7 +186,7 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
 
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
 }
 
@@ -140,3 +236,24 @@ SIMPLE_JWT = {
 
 
 ADMIN_EMAIL = 'awesome@guy.com'
+
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 100))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 8))
+OUTBOX_RETRY_DELAY = int(os.getenv('OUTBOX_RETRY_DELAY', 30))
+OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', 1))
+# Seconds a claimed message is left to its worker before others retry it
+OUTBOX_CLAIM_TIMEOUT = int(os.getenv('OUTBOX_CLAIM_TIMEOUT', 300))
+
+PURGE_BATCH_SIZE = int(os.getenv('PURGE_BATCH_SIZE', 1000))
+PURGE_POLL_INTERVAL = float(os.getenv('PURGE_POLL_INTERVAL', 10))
+
+RANKING_MIN_VOTES = int(os.getenv('RANKING_MIN_VOTES', 5))
+RANKING_WINDOW_DAYS = int(os.getenv('RANKING_WINDOW_DAYS', 7))
+
+# Entries per GET /changes/ response
+CHANGES_BATCH_SIZE = int(os.getenv('CHANGES_BATCH_SIZE', 500))
+CHANGES_COMPACT_EVERY = int(os.getenv('CHANGES_COMPACT_EVERY', 1000))
+CHANGES_RETENTION_DAYS = int(os.getenv('CHANGES_RETENTION_DAYS', 30))
+# Entries after a missing seq are held back this long: the transaction
+# holding it may still be committing
+CHANGES_GAP_TIMEOUT = float(os.getenv('CHANGES_GAP_TIMEOUT', 30))
@@ -0,0 +1,24 @@
+''' Settings of the test suite: `pytest` from the project root.
+
+Tests run on SQLite and a per-process cache. Set DB_NAME (and the other
+DB_* / POSTGRES_* variables of settings.py) to run them on PostgreSQL,
+where tests/test_title_filters.py also checks the query plans.
+'''
+import os
+
+from .settings import *  # noqa: F401,F403
+
+if not os.getenv('DB_NAME'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        },
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+CACHE_IS_SHARED = False
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import time
+from io import BytesIO
+from itertools import count
+
+from asgiref.wsgi import WsgiToAsgiInstance
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from api_yamdb.asgi import WsgiToAsgi
+from .runner import Fixture, percentile
+from .scenarios import SCENARIOS
+
+READ_SCENARIOS = (
+    'titles_list', 'title_detail', 'reviews_list', 'comments_list',
+    'categories_list', 'genres_list',
+)
+
+
+def get_scope(url):
+    path, _, query = url.partition('?')
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'query_string': query.encode(),
+        'headers': [(b'host', b'testserver')],
+        'server': ('testserver', 80),
+    }
+
+
+def get_environ(scope):
+    ''' The WSGI environ the ASGI adapter builds for the scope '''
+    instance = WsgiToAsgiInstance(None)
+    instance.scope = scope
+    return instance.build_environ(scope, BytesIO())
+
+
+class ConcurrencyBenchmark:
+    ''' Sends the catalog reads from `clients` concurrent clients that
+    take `client_delay` seconds to upload a request and as long to read
+    the response, through api_yamdb.asgi and through a threaded WSGI
+    server with the same number of threads '''
+
+    def __init__(self, clients=50, requests=500, threads=8,
+                 client_delay=0.05):
+        self.clients = clients
+        self.requests = requests
+        self.threads = threads
+        self.client_delay = client_delay
+
+    def get_urls(self):
+        fixture = Fixture()
+        scenarios = [
+            scenario for scenario in SCENARIOS
+            if scenario.name in READ_SCENARIOS
+        ]
+        return [
+            scenarios[iteration % len(scenarios)].url(fixture, iteration)
+            for iteration in range(self.requests)
+        ]
+
+    def run(self):
+        urls = self.get_urls()
+        return {
+            'asgi': self.summarize(*self.run_asgi(urls)),
+            'wsgi': self.summarize(*self.run_wsgi(urls)),
+        }
+
+    def summarize(self, timings, elapsed, errors):
+        timings.sort()
+        return {
+            'p50_ms': round(percentile(timings, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+            'rps': round(len(timings) / elapsed, 1),
+            'errors': errors,
+        }
+
+    def run_asgi(self, urls):
+        application = WsgiToAsgi(
+            get_wsgi_application(), self.threads, settings.ASGI_MAX_BODY_SIZE)
+        timings, statuses = [], []
+        next_index = count()
+        delay = self.client_delay
+
+        async def receive():
+            await asyncio.sleep(delay)
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+            elif not message.get('more_body', False):
+                await asyncio.sleep(delay)
+
+        async def client():
+            for index in next_index:
+                if index >= len(urls):
+                    return
+                started = time.perf_counter()
+                await application(get_scope(urls[index]), receive, send)
+                timings.append(time.perf_counter() - started)
+
+        async def main():
+            await asyncio.gather(*(client() for _ in range(self.clients)))
+
+        started = time.perf_counter()
+        asyncio.run(main())
+        elapsed = time.perf_counter() - started
+        application.executor.shutdown()
+        return timings, elapsed, sum(status >= 400 for status in statuses)
+
+    def run_wsgi(self, urls):
+        application = get_wsgi_application()
+        server_threads = threading.BoundedSemaphore(self.threads)
+        timings, statuses = [], []
+        next_index = count()
+        lock = threading.Lock()
+
+        def start_response(status, headers, exc_info=None):
+            statuses.append(int(status.split(' ', 1)[0]))
+
+        def client():
+            while True:
+                with lock:
+                    index = next(next_index)
+                if index >= len(urls):
+                    return
+                started = time.perf_counter()
+                # A server thread is busy for the whole exchange
+                with server_threads:
+                    time.sleep(self.client_delay)
+                    response = application(
+                        get_environ(get_scope(urls[index])),
+                        start_response)
+                    b''.join(response)
+                    response.close()
+                    time.sleep(self.client_delay)
+                timings.append(time.perf_counter() - started)
+
+        clients = [
+            threading.Thread(target=client) for _ in range(self.clients)]
+        started = time.perf_counter()
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return timings, elapsed, sum(status >= 400 for status in statuses)
@@ -0,0 +1,127 @@
+import csv
+import os
+import random
+from math import ceil
+
+from django.conf import settings
+
+SAMPLE_DIR = os.path.join(settings.BASE_DIR, 'reviews', 'static', 'data')
+
+
+def read_sample(name):
+    with open(os.path.join(SAMPLE_DIR, name), encoding='utf-8',
+              newline='') as csv_file:
+        return list(csv.DictReader(csv_file))
+
+
+class DatasetGenerator:
+    ''' Writes a deterministic dataset in the format of reviews/static/data.
+
+    The proportions (reviews per title, genres per title, comments per
+    review) are taken from the sample CSVs and scaled to `reviews`; the
+    same seed always gives the same files. The result is loaded with
+    `manage.py import_csv --path <directory>`.
+    '''
+    def __init__(self, reviews, seed=0):
+        self.rng = random.Random(seed)
+        self.categories = read_sample('category.csv')
+        self.genres = read_sample('genre.csv')
+        sample_titles = read_sample('titles.csv')
+        sample_reviews = read_sample('review.csv')
+        sample_links = read_sample('genre_title.csv')
+        sample_comments = read_sample('comments.csv')
+        self.texts = [row['text'] for row in sample_reviews]
+        self.comment_texts = [row['text'] for row in sample_comments]
+        self.title_names = [row['name'] for row in sample_titles]
+
+        self.reviews = reviews
+        reviews_per_title = len(sample_reviews) / len(sample_titles)
+        self.titles = max(1, ceil(reviews / reviews_per_title))
+        self.genres_per_title = len(sample_links) / len(sample_titles)
+        self.comments_per_review = len(sample_comments) / len(sample_reviews)
+        # Enough authors for the busiest title: one review per author.
+        self.users = max(100, ceil(reviews_per_title * 4), reviews // 20)
+
+    def counts(self):
+        return {
+            'users': self.users,
+            'categories': len(self.categories),
+            'genres': len(self.genres),
+            'titles': self.titles,
+            'reviews': self.reviews,
+        }
+
+    def write(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.write_csv(directory, 'users.csv', (
+            'id', 'username', 'email', 'role', 'bio', 'first_name',
+            'last_name'), self.iter_users())
+        self.write_csv(directory, 'category.csv', ('id', 'name', 'slug'), (
+            (row['id'], row['name'], row['slug'])
+            for row in self.categories))
+        self.write_csv(directory, 'genre.csv', ('id', 'name', 'slug'), (
+            (row['id'], row['name'], row['slug']) for row in self.genres))
+        self.write_csv(directory, 'titles.csv', (
+            'id', 'name', 'year', 'category'), self.iter_titles())
+        self.write_csv(directory, 'genre_title.csv', (
+            'id', 'title_id', 'genre_id'), self.iter_genre_links())
+        self.write_csv(directory, 'review.csv', (
+            'id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+            self.iter_reviews())
+        self.write_csv(directory, 'comments.csv', (
+            'id', 'review_id', 'text', 'author', 'pub_date'),
+            self.iter_comments())
+
+    def write_csv(self, directory, name, header, rows):
+        with open(os.path.join(directory, name), 'w', encoding='utf-8',
+                  newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(header)
+            writer.writerows(rows)
+
+    def iter_users(self):
+        for user_id in range(1, self.users + 1):
+            yield (user_id, f'user{user_id}', f'user{user_id}@yamdb.fake',
+                   'user', '', '', '')
+
+    def iter_titles(self):
+        for title_id in range(1, self.titles + 1):
+            name = self.rng.choice(self.title_names)
+            yield (title_id, f'{name} {title_id}',
+                   self.rng.randint(1920, 2021),
+                   self.rng.choice(self.categories)['id'])
+
+    def iter_genre_links(self):
+        link_id = 0
+        genre_ids = [row['id'] for row in self.genres]
+        for title_id in range(1, self.titles + 1):
+            count = max(1, round(self.rng.expovariate(
+                1 / self.genres_per_title)))
+            for genre_id in self.rng.sample(
+                    genre_ids, min(count, len(genre_ids))):
+                link_id += 1
+                yield link_id, title_id, genre_id
+
+    def pub_date(self):
+        return '{:04d}-{:02d}-{:02d}T{:02d}:{:02d}:{:02d}.000Z'.format(
+            self.rng.randint(2015, 2021), self.rng.randint(1, 12),
+            self.rng.randint(1, 28), self.rng.randint(0, 23),
+            self.rng.randint(0, 59), self.rng.randint(0, 59))
+
+    def iter_reviews(self):
+        ''' Spreads reviews evenly over titles, one per author and title '''
+        review_id = 0
+        per_title, extra = divmod(self.reviews, self.titles)
+        for title_id in range(1, self.titles + 1):
+            count = per_title + (1 if title_id <= extra else 0)
+            for author in self.rng.sample(range(1, self.users + 1), count):
+                review_id += 1
+                yield (review_id, title_id, self.rng.choice(self.texts),
+                       author, self.rng.randint(1, 10), self.pub_date())
+
+    def iter_comments(self):
+        total = round(self.reviews * self.comments_per_review)
+        for comment_id in range(1, total + 1):
+            yield (comment_id, self.rng.randint(1, self.reviews),
+                   self.rng.choice(self.comment_texts),
+                   self.rng.randint(1, self.users), self.pub_date())
@@ -0,0 +1,36 @@
+import os
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from benchmarks.generator import DatasetGenerator
+
+PRESETS = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+
+
+class Command(BaseCommand):
+    help = ('Генерирует детерминированный набор данных для бенчмарков '
+            'и при необходимости загружает его через import_csv')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', choices=PRESETS, default='10k',
+            help='Количество отзывов: 10k, 1m или 10m')
+        parser.add_argument(
+            '--reviews', type=int, help='Точное количество отзывов')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output', default=os.path.join('benchmarks', 'data'))
+        parser.add_argument(
+            '--load', action='store_true',
+            help='Загрузить сгенерированные файлы в базу')
+
+    def handle(self, *args, **options):
+        reviews = options['reviews'] or PRESETS[options['size']]
+        generator = DatasetGenerator(reviews, seed=options['seed'])
+        counts = ', '.join(
+            f'{name}: {count}' for name, count in generator.counts().items())
+        self.stdout.write(f'Генерация ({counts}) в {options["output"]}')
+        generator.write(options['output'])
+        if options['load']:
+            call_command('import_csv', path=options['output'])
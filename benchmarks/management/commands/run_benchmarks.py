@@ -0,0 +1,63 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.runner import BenchmarkRunner, compare, dump
+from benchmarks.scenarios import SCENARIOS
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет сценарии по всем маршрутам API и выводит '
+            'p50/p95/p99, число запросов к базе и пропускную способность')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            choices=[scenario.name for scenario in SCENARIOS],
+            help='Запустить только указанные сценарии')
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+        parser.add_argument(
+            '--baseline', help='JSON предыдущего прогона для сравнения')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимое ухудшение p95 и числа запросов (доля)')
+        parser.add_argument(
+            '--conn-max-age', type=int,
+            help='CONN_MAX_AGE на время прогона (0 - новое соединение '
+                 'на каждый запрос)')
+
+    def handle(self, *args, **options):
+        scenarios = [
+            scenario for scenario in SCENARIOS
+            if not options['scenarios']
+            or scenario.name in options['scenarios']
+        ]
+        runner = BenchmarkRunner(
+            options['iterations'], options['warmup'],
+            conn_max_age=options['conn_max_age'])
+        try:
+            results = runner.run(scenarios)
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write(
+            f'{"scenario":32} {"p50":>8} {"p95":>8} {"p99":>8} '
+            f'{"queries":>8} {"rps":>8} {"conn_ms":>8} {"errors":>6}')
+        for name, row in results['scenarios'].items():
+            self.stdout.write(
+                f'{name:32} {row["p50_ms"]:8.2f} {row["p95_ms"]:8.2f} '
+                f'{row["p99_ms"]:8.2f} {row["queries"]:8.2f} '
+                f'{row["rps"]:8.1f} {row["connect_ms"]:8.3f} '
+                f'{row["errors"]:6}')
+        if options['output']:
+            dump(results, options['output'])
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as baseline:
+                regressions = compare(
+                    results, json.load(baseline), options['threshold'])
+            for name, metric, old, new in regressions:
+                self.stderr.write(f'{name}: {metric} {old} -> {new}')
+            if regressions:
+                sys.exit(1)
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.concurrency import ConcurrencyBenchmark
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает ASGI (api_yamdb.asgi) и многопоточный WSGI на '
+            'чтении каталога при медленных клиентах')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument(
+            '--threads', type=int, default=settings.ASGI_THREADS,
+            help='Потоков у ASGI-приложения и у WSGI-сервера')
+        parser.add_argument(
+            '--client-delay', type=float, default=50,
+            help='Время отправки запроса и чтения ответа клиентом, мс')
+
+    def handle(self, *args, **options):
+        benchmark = ConcurrencyBenchmark(
+            options['clients'], options['requests'], options['threads'],
+            options['client_delay'] / 1000)
+        try:
+            results = benchmark.run()
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write(
+            f'{"mode":8} {"p50":>8} {"p95":>8} {"rps":>8} {"errors":>6}')
+        for mode, row in results.items():
+            self.stdout.write(
+                f'{mode:8} {row["p50_ms"]:8.2f} {row["p95_ms"]:8.2f} '
+                f'{row["rps"]:8.1f} {row["errors"]:6}')
@@ -0,0 +1,210 @@
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+from django import get_version
+from django.conf import settings
+from django.core.cache import cache
+from django.db import (DEFAULT_DB_ALIAS, close_old_connections, connections,
+                       transaction)
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.models import (ADMIN, USER, Category, Genre, Review, Title,
+                            User)
+
+SAMPLE_SIZE = 1000
+BENCH_USERS = (
+    ('bench_admin', ADMIN),
+    ('bench_user', USER),
+)
+
+
+def percentile(values, fraction):
+    ''' Nearest-rank percentile of an already sorted list '''
+    index = max(0, min(len(values) - 1, round(fraction * len(values)) - 1))
+    return values[index]
+
+
+class Fixture:
+    ''' Ids and credentials the scenarios pick from, chosen by id order so
+    every run against the same dataset sends the same requests '''
+
+    def __init__(self):
+        self.title_ids = list(
+            Title.objects.order_by('id').values_list('id', flat=True)
+            [:SAMPLE_SIZE])
+        self.reviews = list(
+            Review.objects.order_by('id').values_list('title_id', 'id')
+            [:SAMPLE_SIZE])
+        self.genre_slugs = list(Genre.objects.values_list('slug', flat=True))
+        self.category_slugs = list(
+            Category.objects.values_list('slug', flat=True))
+        self.title_words = sorted({
+            word for name in Title.objects.order_by('id').values_list(
+                'name', flat=True)[:100]
+            for word in name.split() if len(word) > 3
+        }) or ['a']
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        self.last_page = max(1, -(-Title.objects.count() // page_size))
+        self.admin = self.user = None
+        if not self.title_ids or not self.reviews:
+            raise ValueError(
+                'The database is empty: run generate_benchmark_data first')
+
+    @contextmanager
+    def users(self):
+        ''' Creates the users authenticated scenarios send requests as and
+        deletes them, with anything they wrote, when the run is over.
+        Users left by an interrupted run are replaced. '''
+        usernames = [username for username, _ in BENCH_USERS]
+        User.objects.filter(username__in=usernames).delete()
+        self.admin, self.user = (
+            User.objects.create(
+                username=username, email=f'{username}@yamdb.fake',
+                role=role)
+            for username, role in BENCH_USERS
+        )
+        try:
+            yield
+        finally:
+            User.objects.filter(username__in=usernames).delete()
+            self.admin = self.user = None
+
+    def choice(self, values, iteration):
+        return values[iteration % len(values)]
+
+    def client(self, auth):
+        client = APIClient()
+        user = {'admin': self.admin, 'user': self.user}.get(auth)
+        if user is not None:
+            client.credentials(
+                HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return client
+
+
+class ConnectionTimer:
+    ''' Counts and times connections opened to the database '''
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.count = 0
+        self.seconds = 0.0
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return type(self.connection).connect(self.connection)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+    def __enter__(self):
+        self.connection.connect = self.connect
+        return self
+
+    def __exit__(self, *exc_info):
+        del self.connection.connect
+
+
+class BenchmarkRunner:
+
+    def __init__(self, iterations=100, warmup=10, using=DEFAULT_DB_ALIAS,
+                 conn_max_age=None):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.connection = connections[using]
+        if conn_max_age is not None:
+            # Compare connection setup cost against the configured mode
+            self.connection.close()
+            self.connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+
+    def run(self, scenarios):
+        fixture = Fixture()
+        with fixture.users():
+            return self.run_scenarios(scenarios, fixture)
+
+    def run_scenarios(self, scenarios, fixture):
+        return {
+            'meta': {
+                'vendor': self.connection.vendor,
+                'django': get_version(),
+                'iterations': self.iterations,
+                'conn_max_age': self.connection.settings_dict['CONN_MAX_AGE'],
+                'titles': Title.objects.count(),
+                'reviews': Review.objects.count(),
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            },
+            'scenarios': {
+                scenario.name: self.run_scenario(scenario, fixture)
+                for scenario in scenarios
+            },
+        }
+
+    def run_scenario(self, scenario, fixture):
+        cache.clear()
+        client = fixture.client(scenario.auth)
+        # Writes are rolled back so every run sees the same dataset.
+        with transaction.atomic() if scenario.writes else nullcontext():
+            for iteration in range(self.warmup):
+                self.request(client, scenario, fixture, -1 - iteration)
+            timings, queries, errors = [], [], 0
+            started = time.perf_counter()
+            with ConnectionTimer(self.connection) as connects:
+                for iteration in range(self.iterations):
+                    with CaptureQueriesContext(self.connection) as context:
+                        request_started = time.perf_counter()
+                        response = self.request(
+                            client, scenario, fixture, iteration)
+                        timings.append(time.perf_counter() - request_started)
+                    queries.append(len(context.captured_queries))
+                    if response.status_code >= 400:
+                        errors += 1
+                    if not scenario.writes:
+                        # The test client does not close connections at
+                        # the end of a request, a real server does.
+                        close_old_connections()
+            elapsed = time.perf_counter() - started
+            if scenario.writes:
+                transaction.set_rollback(True)
+        timings.sort()
+        return {
+            'p50_ms': round(percentile(timings, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(timings, 0.99) * 1000, 3),
+            'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+            'queries': round(sum(queries) / len(queries), 2),
+            'rps': round(self.iterations / elapsed, 1),
+            'connects': round(connects.count / self.iterations, 2),
+            'connect_ms': round(
+                connects.seconds / self.iterations * 1000, 3),
+            'errors': errors,
+        }
+
+    def request(self, client, scenario, fixture, iteration):
+        url = scenario.url(fixture, iteration)
+        if scenario.data is None:
+            return getattr(client, scenario.method)(url)
+        return getattr(client, scenario.method)(
+            url, scenario.data(fixture, iteration), format='json')
+
+
+def compare(results, baseline, threshold):
+    ''' Returns (scenario, metric, old, new) for every p95 latency or
+    query count that got worse than the baseline by more than threshold '''
+    regressions = []
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        for metric in ('p95_ms', 'queries'):
+            if current[metric] > previous[metric] * (1 + threshold):
+                regressions.append(
+                    (name, metric, previous[metric], current[metric]))
+    return regressions
+
+
+def dump(results, path):
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(results, output, indent=2, sort_keys=True)
@@ -0,0 +1,79 @@
+class Scenario:
+    ''' One scripted request against the API.
+
+    `url` and `data` are callables taking the benchmark fixture and the
+    iteration number. Scenarios that write run inside a transaction that
+    is rolled back, so the dataset stays the same between runs.
+    '''
+
+    def __init__(self, name, url, method='get', data=None, auth=None,
+                 writes=False):
+        self.name = name
+        self.url = url
+        self.method = method
+        self.data = data
+        self.auth = auth
+        self.writes = writes
+
+
+SCENARIOS = (
+    Scenario('titles_list', lambda f, i: '/api/v1/titles/'),
+    Scenario('titles_list_deep_page', lambda f, i: (
+        f'/api/v1/titles/?page={f.last_page}')),
+    Scenario('titles_list_cursor', lambda f, i: (
+        '/api/v1/titles/?pagination=cursor')),
+    Scenario('titles_filter_genre', lambda f, i: (
+        f'/api/v1/titles/?genre={f.choice(f.genre_slugs, i)}')),
+    Scenario('titles_filter_category_year', lambda f, i: (
+        f'/api/v1/titles/?category={f.choice(f.category_slugs, i)}'
+        f'&year={1920 + i % 100}')),
+    Scenario('titles_filter_name', lambda f, i: (
+        f'/api/v1/titles/?name={f.choice(f.title_words, i)}')),
+    Scenario('titles_search', lambda f, i: (
+        f'/api/v1/titles/?search={f.choice(f.title_words, i)}')),
+    Scenario('title_detail', lambda f, i: (
+        f'/api/v1/titles/{f.choice(f.title_ids, i)}/')),
+    Scenario('categories_list', lambda f, i: '/api/v1/categories/'),
+    Scenario('genres_list', lambda f, i: '/api/v1/genres/'),
+    Scenario('reviews_list', lambda f, i: (
+        f'/api/v1/titles/{f.choice(f.title_ids, i)}/reviews/')),
+    Scenario('review_detail', lambda f, i: (
+        '/api/v1/titles/{}/reviews/{}/'.format(*f.choice(f.reviews, i)))),
+    Scenario('comments_list', lambda f, i: (
+        '/api/v1/titles/{}/reviews/{}/comments/'.format(
+            *f.choice(f.reviews, i)))),
+    Scenario('users_me', lambda f, i: '/api/v1/users/me/', auth='user'),
+    Scenario('users_list', lambda f, i: '/api/v1/users/', auth='admin'),
+    Scenario(
+        'signup', lambda f, i: '/api/v1/auth/signup/', method='post',
+        data=lambda f, i: {
+            'username': f'bench_signup_{i}',
+            'email': f'bench_signup_{i}@yamdb.fake',
+        },
+        writes=True),
+    Scenario(
+        'token', lambda f, i: '/api/v1/auth/token/', method='post',
+        data=lambda f, i: {
+            'username': f.user.username,
+            'confirmation_code': f.user.confirmation_code,
+        }),
+    Scenario(
+        'review_create', lambda f, i: (
+            f'/api/v1/titles/{f.choice(f.title_ids, i)}/reviews/'),
+        method='post', data=lambda f, i: {'text': 'Benchmark', 'score': 7},
+        auth='user', writes=True),
+    Scenario(
+        'admin_create_category', lambda f, i: '/api/v1/categories/',
+        method='post', data=lambda f, i: {
+            'name': f'Bench category {i}', 'slug': f'bench-category-{i}'},
+        auth='admin', writes=True),
+    Scenario(
+        'admin_create_title', lambda f, i: '/api/v1/titles/',
+        method='post', data=lambda f, i: {
+            'name': f'Bench title {i}',
+            'year': 2000,
+            'category': f.choice(f.category_slugs, i),
+            'genre': [f.choice(f.genre_slugs, i)],
+        },
+        auth='admin', writes=True),
+)
@@ -0,0 +1,21 @@
+#!/bin/sh
+# SERVER_MODE=wsgi (default): gthread workers running the WSGI app.
+# SERVER_MODE=asgi: uvicorn workers running api_yamdb.asgi, which serves
+# the WSGI app from ASGI_THREADS threads per worker.
+set -e
+
+case "${SERVER_MODE:-wsgi}" in
+    wsgi)
+        exec gunicorn api_yamdb.wsgi:application \
+            -c python:api_yamdb.gunicorn_conf
+        ;;
+    asgi)
+        exec gunicorn api_yamdb.asgi:application \
+            -c python:api_yamdb.gunicorn_conf \
+            -k uvicorn.workers.UvicornWorker
+        ;;
+    *)
+        echo "Unknown SERVER_MODE: $SERVER_MODE (expected wsgi or asgi)" >&2
+        exit 1
+        ;;
+esac
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Category, Comment, Genre, Review, Title, User
+from .models import (Category, Comment, Genre, OutgoingEmail, Review, Title,
+                     User)
 
 
 admin.site.register(User)
@@ -9,3 +10,4 @@ admin.site.register(Genre)
 admin.site.register(Title)
 admin.site.register(Review)
 admin.site.register(Comment)
+admin.site.register(OutgoingEmail)
@@ -0,0 +1,126 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import Category, ChangeLog, Comment, Genre, Review, Title
+
+# Models whose changes clients can sync from the change log
+TRACKED_MODELS = (Category, Genre, Title, Review, Comment)
+
+
+def log_changes(model, object_ids, action):
+    ''' Appends one change log entry per object.
+
+    Every segment of CHANGES_COMPACT_EVERY seqs filled by these entries
+    is compacted, and old entries are pruned, after the commit.
+    '''
+    entries = [
+        ChangeLog(model=model._meta.model_name, object_id=object_id,
+                  action=action)
+        for object_id in object_ids
+    ]
+    if not entries:
+        return
+    if len(entries) == 1:
+        entries[0].save()
+        first_seq = last_seq = entries[0].seq
+    else:
+        ChangeLog.objects.bulk_create(entries)
+        first_seq, last_seq = entries[0].seq, entries[-1].seq
+        if last_seq is None:
+            # SQLite and MySQL do not return ids from a bulk insert
+            last_seq = ChangeLog.objects.aggregate(
+                last_seq=Max('seq'))['last_seq']
+            first_seq = last_seq - len(entries) + 1
+    every = settings.CHANGES_COMPACT_EVERY
+    ends = range((first_seq - 1) // every * every + every, last_seq + 1, every)
+    if ends:
+        transaction.on_commit(lambda: maintain_changes(ends, every))
+
+
+def committed_entries(entries, since, timeout):
+    ''' Returns the entries that follow `since` up to the first recent
+    gap in their seqs, and whether any were held back.
+
+    A missing seq belongs to a transaction that is still committing,
+    to a rolled back one, or to an entry deleted by compaction or
+    pruning. Only the first kind can appear later, so the entries after
+    a gap are held back until the entry that follows it is `timeout`
+    seconds old.
+    '''
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    expected = since + 1
+    for index, entry in enumerate(entries):
+        if entry.seq != expected and entry.created_at > cutoff:
+            return entries[:index], True
+        expected = entry.seq + 1
+    return entries, False
+
+
+def maintain_changes(ends, every):
+    ''' Compacts the segments of `every` seqs ending at `ends`, then
+    prunes expired entries '''
+    for end in ends:
+        compact_changes(end - every, end)
+    prune_changes(
+        timezone.now() - timedelta(days=settings.CHANGES_RETENTION_DAYS))
+
+
+def compact_changes(start, end):
+    ''' Deletes the entries superseded by the latest entry of the same
+    object in the seq range (start, end]. Clients sync the current state
+    of changed objects, so superseded entries carry nothing.
+
+    The oldest entry is kept: it tells how far back the log goes.
+    Returns the number of deleted entries.
+    '''
+    oldest = ChangeLog.objects.values_list('seq', flat=True).first()
+    latest = defaultdict(dict)
+    for model, object_id, last_seq in (
+        ChangeLog.objects.filter(seq__gt=start, seq__lte=end).order_by()
+        .values('model', 'object_id').annotate(last_seq=Max('seq'))
+        .values_list('model', 'object_id', 'last_seq')
+    ):
+        latest[model][object_id] = last_seq
+    deleted = 0
+    for model, seqs in latest.items():
+        with transaction.atomic():
+            deleted += ChangeLog.objects.filter(
+                model=model, object_id__in=seqs, seq__lte=end,
+            ).exclude(seq__in=[oldest, *seqs.values()]).delete()[0]
+    return deleted
+
+
+def compact_all_changes(segment_size):
+    ''' Compacts the whole log, segment_size entries at a time '''
+    seqs = ChangeLog.objects.aggregate(first=Min('seq'), last=Max('seq'))
+    if seqs['last'] is None:
+        return 0
+    deleted = 0
+    for start in range(seqs['first'] - 1, seqs['last'], segment_size):
+        deleted += compact_changes(start, start + segment_size)
+    return deleted
+
+
+def prune_changes(before, batch_size=1000):
+    ''' Deletes entries created before `before`, batch_size per
+    transaction. The newest entry is always kept, so the log never
+    forgets how far it goes. Returns the number of deleted entries '''
+    newest = ChangeLog.objects.order_by('-seq').values_list(
+        'seq', flat=True).first()
+    if newest is None:
+        return 0
+    expired = ChangeLog.objects.filter(
+        created_at__lt=before, seq__lt=newest).values_list('seq', flat=True)
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            count = ChangeLog.objects.filter(
+                seq__in=list(expired[:batch_size])).delete()[0]
+        deleted += count
+        if count < batch_size:
+            return deleted
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from reviews.changes import compact_all_changes, prune_changes
+
+
+class Command(BaseCommand):
+    help = ('Сжимает журнал изменений (оставляет последнюю запись по '
+            'каждому объекту) и удаляет старые записи')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--segment-size', type=int,
+            default=settings.CHANGES_COMPACT_EVERY)
+        parser.add_argument(
+            '--retention-days', type=int,
+            default=settings.CHANGES_RETENTION_DAYS,
+            help='Записи старше удаляются; клиенты, отставшие сильнее, '
+                 'получают 410 и загружают каталог заново')
+
+    def handle(self, *args, **options):
+        compacted = compact_all_changes(options['segment_size'])
+        pruned = prune_changes(
+            timezone.now() - timedelta(days=options['retention_days']))
+        self.stdout.write(self.style.SUCCESS(
+            f'Сжато записей: {compacted}, удалено старых: {pruned}'))
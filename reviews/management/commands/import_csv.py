@@ -0,0 +1,251 @@
+import csv
+import io
+import os
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from reviews.changes import TRACKED_MODELS, log_changes
+from reviews.models import (Category, ChangeLog, Comment, Genre, Review,
+                            Title, User)
+from reviews.ratings import rebuild_title_ratings, rebuild_title_stats
+
+# Files in dependency order: parents are loaded before their children.
+SOURCES = (
+    ('users.csv', User),
+    ('category.csv', Category),
+    ('genre.csv', Genre),
+    ('titles.csv', Title),
+    ('genre_title.csv', Title.genre.through),
+    ('review.csv', Review),
+    ('comments.csv', Comment),
+)
+SOURCE_MODELS = {model for _, model in SOURCES}
+NULL = r'\N'
+
+
+@contextmanager
+def keep_timestamps(model):
+    ''' Stops auto_now/auto_now_add from overwriting imported dates '''
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    flags = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield fields
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = ('Загружает данные из reviews/static/data в базу: COPY на '
+            'PostgreSQL, bulk_create на остальных базах')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=os.path.join(settings.BASE_DIR, 'reviews', 'static',
+                                 'data'))
+        parser.add_argument('--chunk-size', type=int, default=10000)
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Использовать bulk_create и на PostgreSQL')
+
+    def handle(self, *args, **options):
+        self.chunk_size = options['chunk_size']
+        self.use_copy = (
+            connection.vendor == 'postgresql' and not options['no_copy'])
+        for file_name, model in SOURCES:
+            file_path = os.path.join(options['path'], file_name)
+            if not os.path.exists(file_path):
+                raise CommandError(f'Файл не найден: {file_path}')
+        self.drop_indexes()
+        try:
+            for file_name, model in SOURCES:
+                self.load(os.path.join(options['path'], file_name), model)
+        finally:
+            self.create_indexes()
+        self.reset_sequences()
+        self.stdout.write('Пересчет рейтингов...')
+        with transaction.atomic():
+            rebuild_title_ratings()
+        self.stdout.write('Пересчет статистики оценок...')
+        rebuild_title_stats(batch_size=settings.STATS_REBUILD_BATCH_SIZE)
+        self.stdout.write(self.style.SUCCESS('Импорт завершен'))
+
+    def load(self, file_path, model):
+        file_name = os.path.basename(file_path)
+        started = time.monotonic()
+        loaded = skipped = 0
+        with open(file_path, encoding='utf-8', newline='') as csv_file:
+            reader = csv.DictReader(csv_file)
+            fields = self.map_columns(model, reader.fieldnames)
+            with keep_timestamps(model) as timestamp_fields:
+                while True:
+                    rows = list(islice(reader, self.chunk_size))
+                    if not rows:
+                        break
+                    self.now = timezone.now()
+                    objects = self.new_objects(model, [
+                        self.build(model, fields, timestamp_fields, row)
+                        for row in rows
+                    ])
+                    with transaction.atomic():
+                        self.insert(model, objects)
+                        self.log_changes(model, objects)
+                    loaded += len(objects)
+                    skipped += len(rows) - len(objects)
+                    rate = loaded / max(time.monotonic() - started, 1e-6)
+                    self.stdout.write(
+                        f'{file_name}: {loaded} загружено, '
+                        f'{skipped} пропущено ({rate:.0f} строк/с)')
+
+    def map_columns(self, model, columns):
+        by_name = {}
+        for field in model._meta.concrete_fields:
+            by_name[field.name] = field
+            by_name[field.attname] = field
+        return {
+            column: by_name[column] for column in columns
+            if column in by_name
+        }
+
+    def build(self, model, fields, timestamp_fields, row):
+        ''' Returns an unsaved instance for the row '''
+        values = {}
+        for column, field in fields.items():
+            value = row[column]
+            if value == '':
+                values[field.attname] = None if field.null else value
+            else:
+                values[field.attname] = field.to_python(value)
+        obj = model(**values)
+        for field in timestamp_fields:
+            if getattr(obj, field.attname) is None:
+                setattr(obj, field.attname, self.now)
+        if isinstance(obj, User):
+            obj.set_unusable_password()
+        return obj
+
+    def new_objects(self, model, objects):
+        ''' Leaves out rows imported by a previous run and rows pointing to
+        a missing parent. Only the ids of the chunk are looked up, one
+        query per model, so memory does not grow with the tables. '''
+        existing = self.existing_ids(model, {obj.pk for obj in objects})
+        relations = [
+            field for field in model._meta.concrete_fields
+            if field.is_relation and field.related_model in SOURCE_MODELS
+        ]
+        parent_ids = {
+            field: self.existing_ids(field.related_model, {
+                getattr(obj, field.attname) for obj in objects
+            } - {None})
+            for field in relations
+        }
+        return [
+            obj for obj in objects
+            if obj.pk not in existing and all(
+                getattr(obj, field.attname) in parent_ids[field]
+                for field in relations
+                if getattr(obj, field.attname) is not None
+            )
+        ]
+
+    def existing_ids(self, model, ids):
+        ''' Returns the ids found in the table, looked up in batches the
+        backend accepts as query parameters '''
+        ids = list(ids)
+        batch_size = connection.features.max_query_params or len(ids) or 1
+        found = set()
+        for start in range(0, len(ids), batch_size):
+            found.update(model._base_manager.filter(
+                pk__in=ids[start:start + batch_size],
+            ).values_list('pk', flat=True))
+        return found
+
+    def insert(self, model, objects):
+        if not objects:
+            return
+        if not self.use_copy:
+            # bulk_create picks the largest batch the backend accepts
+            model._default_manager.bulk_create(objects)
+            return
+        fields = model._meta.concrete_fields
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for obj in objects:
+            writer.writerow([
+                NULL if value is None else value
+                for value in (
+                    field.get_db_prep_save(
+                        getattr(obj, field.attname), connection)
+                    for field in fields
+                )
+            ])
+        buffer.seek(0)
+        columns = ', '.join(
+            connection.ops.quote_name(field.column) for field in fields)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {connection.ops.quote_name(model._meta.db_table)} '
+                f"({columns}) FROM STDIN WITH (FORMAT csv, NULL '{NULL}')",
+                buffer,
+            )
+
+    def log_changes(self, model, objects):
+        ''' Imported rows reach syncing clients through the change log '''
+        if model in TRACKED_MODELS:
+            log_changes(model, [obj.pk for obj in objects], ChangeLog.CREATE)
+        elif model is Title.genre.through:
+            log_changes(
+                Title, {obj.title_id for obj in objects}, ChangeLog.UPDATE)
+
+    def indexed_models(self):
+        return [model for _, model in SOURCES if model._meta.indexes]
+
+    def existing_indexes(self, model):
+        with connection.cursor() as cursor:
+            return connection.introspection.get_constraints(
+                cursor, model._meta.db_table)
+
+    def drop_indexes(self):
+        ''' Drops secondary Meta.indexes on PostgreSQL for the load '''
+        if not self.use_copy:
+            return
+        with connection.schema_editor() as schema_editor:
+            for model in self.indexed_models():
+                existing = self.existing_indexes(model)
+                for index in model._meta.indexes:
+                    if index.name in existing:
+                        schema_editor.remove_index(model, index)
+
+    def create_indexes(self):
+        if not self.use_copy:
+            return
+        self.stdout.write('Создание индексов...')
+        with connection.schema_editor() as schema_editor:
+            for model in self.indexed_models():
+                existing = self.existing_indexes(model)
+                for index in model._meta.indexes:
+                    if index.name not in existing:
+                        schema_editor.add_index(model, index)
+
+    def reset_sequences(self):
+        sql_list = connection.ops.sequence_reset_sql(
+            no_style(), [model for _, model in SOURCES])
+        if not sql_list:
+            return
+        with connection.cursor() as cursor:
+            for sql in sql_list:
+                cursor.execute(sql)
@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reviews.purge import purge_deleted
+
+
+class Command(BaseCommand):
+    help = ('Удаляет помеченных на удаление пользователей и произведения '
+            'вместе с отзывами и комментариями, пачками')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.PURGE_BATCH_SIZE)
+        parser.add_argument(
+            '--interval', type=float, default=settings.PURGE_POLL_INTERVAL,
+            help='Пауза в секундах, когда удалять нечего')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Удалить то, что помечено сейчас, и завершиться')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                purged = purge_deleted(options['batch_size'])
+                if purged:
+                    self.stdout.write(f'Удалено объектов: {purged}')
+                if options['once']:
+                    break
+                if not purged:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
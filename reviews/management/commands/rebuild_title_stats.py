@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reviews.ratings import rebuild_title_stats
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает статистику оценок произведений по отзывам '
+            'и исправляет расхождения, пачками')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.STATS_REBUILD_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        fixed = rebuild_title_stats(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Исправлено строк статистики: {fixed}'))
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reviews.rankings import refresh_rankings
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает топ и тренды произведений; '
+            'запускается периодически (cron)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window-days', type=int, default=settings.RANKING_WINDOW_DAYS)
+        parser.add_argument(
+            '--min-votes', type=int, default=settings.RANKING_MIN_VOTES)
+
+    def handle(self, *args, **options):
+        count = refresh_rankings(
+            options['window_days'], options['min_votes'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Рейтинги обновлены: {count}'))
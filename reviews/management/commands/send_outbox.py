@@ -0,0 +1,87 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from reviews.models import OutgoingEmail
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди OutgoingEmail'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument(
+            '--interval', type=float, default=settings.OUTBOX_POLL_INTERVAL,
+            help='Пауза в секундах, когда очередь пуста')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Отправить одну пачку и завершиться')
+
+    def handle(self, *args, **options):
+        connection = get_connection(fail_silently=False)
+        try:
+            while True:
+                sent = self.send_batch(connection, options['batch_size'])
+                if options['once']:
+                    break
+                if not sent:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+
+    def send_batch(self, connection, batch_size):
+        ''' Sends due messages over one SMTP connection.
+
+        Messages are claimed in a short transaction: rows are locked with
+        SKIP LOCKED, so several workers can drain the outbox at once, and
+        their next attempt is pushed OUTBOX_CLAIM_TIMEOUT seconds ahead.
+        Sending runs outside the transaction and every result is saved
+        right after its message, so a crashed worker resends nothing it
+        already sent; what it did not get to is due again once the claim
+        expires. Failed messages are retried with exponential backoff
+        until OUTBOX_MAX_ATTEMPTS is reached.
+        '''
+        now = timezone.now()
+        with transaction.atomic():
+            messages = list(
+                OutgoingEmail.objects.select_for_update(skip_locked=True)
+                .filter(sent_at__isnull=True,
+                        attempts__lt=settings.OUTBOX_MAX_ATTEMPTS,
+                        next_attempt_at__lte=now)
+                .order_by('id')[:batch_size]
+            )
+            if not messages:
+                return 0
+            for message in messages:
+                message.attempts += 1
+                message.next_attempt_at = now + timedelta(
+                    seconds=settings.OUTBOX_CLAIM_TIMEOUT)
+            OutgoingEmail.objects.bulk_update(
+                messages, ('attempts', 'next_attempt_at'))
+        sent = 0
+        for message in messages:
+            try:
+                connection.open()
+                connection.send_messages([message.as_message(connection)])
+            except Exception as error:
+                connection.close()
+                delay = settings.OUTBOX_RETRY_DELAY * 2 ** (
+                    message.attempts - 1)
+                message.next_attempt_at = timezone.now() + timedelta(
+                    seconds=delay)
+                message.last_error = repr(error)
+                message.save(update_fields=('next_attempt_at', 'last_error'))
+            else:
+                message.sent_at = timezone.now()
+                message.save(update_fields=('sent_at',))
+                sent += 1
+        self.stdout.write(f'Отправлено {sent} из {len(messages)}')
+        return len(messages)
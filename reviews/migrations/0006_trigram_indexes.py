@@ -0,0 +1,38 @@
+from django.db import migrations
+
+TRIGRAM_INDEXES = (
+    ('title_name_trgm_idx', 'reviews_title', 'name'),
+    ('title_name_upper_trgm_idx', 'reviews_title', 'UPPER(name::text)'),
+    ('category_name_upper_trgm_idx', 'reviews_category',
+     'UPPER(name::text)'),
+    ('genre_name_upper_trgm_idx', 'reviews_genre', 'UPPER(name::text)'),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, expression in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} '
+            f'USING gin (({expression}) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, expression in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_pub_date_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
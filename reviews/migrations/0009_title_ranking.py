@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleRanking',
+            fields=[
+                ('title', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='reviews.Title', verbose_name='Произведение')),
+                ('weighted_rating', models.FloatField(verbose_name='Взвешенный рейтинг')),
+                ('recent_reviews', models.PositiveIntegerField(verbose_name='Отзывов за период')),
+                ('trending_score', models.FloatField(verbose_name='Отзывов в день за период')),
+                ('top_position', models.PositiveIntegerField(db_index=True, verbose_name='Место в топе')),
+                ('trending_position', models.PositiveIntegerField(db_index=True, verbose_name='Место в трендах')),
+                ('refreshed_at', models.DateTimeField(verbose_name='Дата расчета')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг произведения',
+                'verbose_name_plural': 'Рейтинги произведений',
+                'ordering': ('top_position',),
+            },
+        ),
+    ]
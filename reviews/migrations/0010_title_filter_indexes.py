@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_title_ranking'),
+    ]
+
+    operations = [
+        # Genre filters look up titles by genre: the through table only
+        # has the (title_id, genre_id) unique index.
+        migrations.RunSQL(
+            'CREATE INDEX title_genre_genre_title_idx '
+            'ON reviews_title_genre (genre_id, title_id)',
+            'DROP INDEX title_genre_genre_title_idx',
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'year'], name='title_category_year_idx'),
+        ),
+    ]
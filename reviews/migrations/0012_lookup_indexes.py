@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_soft_delete'),
+    ]
+
+    operations = [
+        # Case-insensitive lookups of signup and admin tools
+        migrations.RunSQL(
+            'CREATE INDEX user_email_lower_idx ON reviews_user (LOWER(email))',
+            'DROP INDEX user_email_lower_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX user_username_lower_idx '
+            'ON reviews_user (LOWER(username))',
+            'DROP INDEX user_username_lower_idx',
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['author', 'title'], name='review_author_title_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:44
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    TitleStats = apps.get_model('reviews', 'TitleStats')
+    Review = apps.get_model('reviews', 'Review')
+    rows = Review.objects.order_by().values('title_id').annotate(
+        first_review_at=Min('pub_date'),
+        last_review_at=Max('pub_date'),
+        **{
+            f'score_{score}': Count('pk', filter=Q(score=score))
+            for score in range(1, 11)
+        },
+    )
+    TitleStats.objects.bulk_create(TitleStats(**row) for row in rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0012_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleStats',
+            fields=[
+                ('title', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='reviews.Title', verbose_name='Произведение')),
+                ('score_1', models.PositiveIntegerField(default=0, verbose_name='Оценок 1')),
+                ('score_2', models.PositiveIntegerField(default=0, verbose_name='Оценок 2')),
+                ('score_3', models.PositiveIntegerField(default=0, verbose_name='Оценок 3')),
+                ('score_4', models.PositiveIntegerField(default=0, verbose_name='Оценок 4')),
+                ('score_5', models.PositiveIntegerField(default=0, verbose_name='Оценок 5')),
+                ('score_6', models.PositiveIntegerField(default=0, verbose_name='Оценок 6')),
+                ('score_7', models.PositiveIntegerField(default=0, verbose_name='Оценок 7')),
+                ('score_8', models.PositiveIntegerField(default=0, verbose_name='Оценок 8')),
+                ('score_9', models.PositiveIntegerField(default=0, verbose_name='Оценок 9')),
+                ('score_10', models.PositiveIntegerField(default=0, verbose_name='Оценок 10')),
+                ('first_review_at', models.DateTimeField(blank=True, null=True, verbose_name='Первый отзыв')),
+                ('last_review_at', models.DateTimeField(blank=True, null=True, verbose_name='Последний отзыв')),
+            ],
+            options={
+                'verbose_name': 'Статистика произведения',
+                'verbose_name_plural': 'Статистика произведений',
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
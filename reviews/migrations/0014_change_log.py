@@ -0,0 +1,32 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0013_title_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False, verbose_name='Номер изменения')),
+                ('model', models.CharField(max_length=20, verbose_name='Модель')),
+                ('object_id', models.PositiveIntegerField(verbose_name='Объект')),
+                ('action', models.CharField(choices=[('create', 'create'), ('update', 'update'), ('delete', 'delete')], max_length=6, verbose_name='Действие')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Изменение',
+                'verbose_name_plural': 'Журнал изменений',
+                'ordering': ('seq',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['model', 'object_id'], name='changelog_object_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0014_change_log'),
+    ]
+
+    operations = [
+        # Filters look titles up by category or genre first. The foreign
+        # key indexes are prefixes of title_category_year_idx and
+        # title_genre_genre_title_idx, so the planner used them and
+        # fetched every row of the category or genre instead.
+        migrations.AlterField(
+            model_name='title',
+            name='category',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='reviews.Category', verbose_name='Категория'),
+        ),
+        migrations.RunSQL(
+            'DROP INDEX reviews_title_genre_genre_id_1872fed8',
+            'CREATE INDEX reviews_title_genre_genre_id_1872fed8 '
+            'ON reviews_title_genre (genre_id)',
+        ),
+    ]
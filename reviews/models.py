@@ -1,8 +1,10 @@
 import uuid
 
 from django.contrib.auth.models import AbstractUser
+from django.core.mail import EmailMessage
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
 
 from .validators import year_validator
 
@@ -24,6 +26,9 @@ class User(AbstractUser):
         'Права доступа', choices=ROLES, default=USER, max_length=10)
     confirmation_code = models.CharField(
         'Код подтверждения', max_length=36, default=uuid.uuid4)
+    deleted_at = models.DateTimeField(
+        'Дата удаления', null=True, blank=True, editable=False,
+        db_index=True)
 
     class Meta:
         verbose_name = 'Пользователь'
@@ -41,10 +46,18 @@ class User(AbstractUser):
     def __str__(self) -> str:
         return self.username
 
+    def soft_delete(self):
+        ''' Deactivates the user; purge_deleted removes the rows later '''
+        self.is_active = False
+        self.deleted_at = timezone.now()
+        self.save(update_fields=('is_active', 'deleted_at'))
+
 
 class Genre(models.Model):
     name = models.CharField('Жанр', max_length=150, unique=True)
     slug = models.SlugField('Слаг', unique=True)
+    updated_at = models.DateTimeField(
+        'Дата изменения', auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = 'Жанр'
@@ -55,24 +68,57 @@ class Genre(models.Model):
         return self.name
 
 
+class TitleManager(models.Manager):
+    ''' Hides soft-deleted titles '''
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Title(models.Model):
     name = models.CharField('Название', max_length=150)
     year = models.PositiveIntegerField(
         'Год выхода', validators=[year_validator])
     description = models.TextField('Описание', blank=True)
     genre = models.ManyToManyField(Genre, 'Жанр')
+    # Served by title_category_year_idx
     category = models.ForeignKey(
         'Category', verbose_name='Категория', null=True,
-        on_delete=models.SET_NULL)
+        on_delete=models.SET_NULL, db_index=False)
+    rating = models.FloatField(
+        'Рейтинг', null=True, blank=True, editable=False)
+    review_count = models.PositiveIntegerField(
+        'Количество отзывов', default=0, editable=False)
+    score_sum = models.PositiveIntegerField(
+        'Сумма оценок', default=0, editable=False)
+    updated_at = models.DateTimeField(
+        'Дата изменения', auto_now=True, db_index=True)
+    deleted_at = models.DateTimeField(
+        'Дата удаления', null=True, blank=True, editable=False,
+        db_index=True)
+
+    objects = TitleManager()
+    all_objects = models.Manager()
 
     class Meta:
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
+        indexes = [
+            models.Index(
+                fields=('category', 'year'),
+                name='title_category_year_idx'
+            ),
+        ]
         ordering = ('id',)
 
     def __str__(self) -> str:
         return self.name
 
+    def soft_delete(self):
+        ''' Hides the title; purge_deleted removes the rows later '''
+        self.deleted_at = timezone.now()
+        self.save(update_fields=('deleted_at', 'updated_at'))
+
 
 class Review(models.Model):
     author = models.ForeignKey(
@@ -90,6 +136,8 @@ class Review(models.Model):
             MaxValueValidator(
                 10, 'You can rate a title on a scale from 1 to 10')])
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated_at = models.DateTimeField(
+        'Дата изменения', auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = 'Отзыв'
@@ -100,6 +148,16 @@ class Review(models.Model):
                 name='unique_review'
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=('title', '-pub_date', 'id'),
+                name='review_title_pub_date_idx'
+            ),
+            models.Index(
+                fields=('author', 'title'),
+                name='review_author_title_idx'
+            ),
+        ]
         ordering = ('-pub_date',)
 
 
@@ -112,10 +170,18 @@ class Comment(models.Model):
         verbose_name='Автор')
     text = models.TextField('Комментарий к отзыву')
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated_at = models.DateTimeField(
+        'Дата изменения', auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=('review', '-pub_date', 'id'),
+                name='comment_review_pub_date_idx'
+            ),
+        ]
         ordering = ('-pub_date',)
 
     def __str__(self) -> str:
@@ -125,6 +191,8 @@ class Comment(models.Model):
 class Category(models.Model):
     name = models.CharField('Категория', max_length=256, unique=True)
     slug = models.SlugField('Слаг', unique=True, max_length=50)
+    updated_at = models.DateTimeField(
+        'Дата изменения', auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = 'Категория'
@@ -133,3 +201,135 @@ class Category(models.Model):
 
     def __str__(self) -> str:
         return self.name
+
+
+class TitleRanking(models.Model):
+    title = models.OneToOneField(
+        Title, on_delete=models.CASCADE, primary_key=True,
+        related_name='ranking', verbose_name='Произведение')
+    weighted_rating = models.FloatField('Взвешенный рейтинг')
+    recent_reviews = models.PositiveIntegerField('Отзывов за период')
+    trending_score = models.FloatField('Отзывов в день за период')
+    top_position = models.PositiveIntegerField(
+        'Место в топе', db_index=True)
+    trending_position = models.PositiveIntegerField(
+        'Место в трендах', db_index=True)
+    refreshed_at = models.DateTimeField('Дата расчета')
+
+    class Meta:
+        verbose_name = 'Рейтинг произведения'
+        verbose_name_plural = 'Рейтинги произведений'
+        ordering = ('top_position',)
+
+    def __str__(self) -> str:
+        return f'{self.title_id}: {self.top_position}'
+
+
+class TitleStats(models.Model):
+    title = models.OneToOneField(
+        Title, on_delete=models.CASCADE, primary_key=True,
+        related_name='stats', verbose_name='Произведение')
+    score_1 = models.PositiveIntegerField('Оценок 1', default=0)
+    score_2 = models.PositiveIntegerField('Оценок 2', default=0)
+    score_3 = models.PositiveIntegerField('Оценок 3', default=0)
+    score_4 = models.PositiveIntegerField('Оценок 4', default=0)
+    score_5 = models.PositiveIntegerField('Оценок 5', default=0)
+    score_6 = models.PositiveIntegerField('Оценок 6', default=0)
+    score_7 = models.PositiveIntegerField('Оценок 7', default=0)
+    score_8 = models.PositiveIntegerField('Оценок 8', default=0)
+    score_9 = models.PositiveIntegerField('Оценок 9', default=0)
+    score_10 = models.PositiveIntegerField('Оценок 10', default=0)
+    first_review_at = models.DateTimeField(
+        'Первый отзыв', null=True, blank=True)
+    last_review_at = models.DateTimeField(
+        'Последний отзыв', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Статистика произведения'
+        verbose_name_plural = 'Статистика произведений'
+
+    @classmethod
+    def for_title(cls, title):
+        ''' Returns the stats of the title, empty when it has no reviews '''
+        try:
+            return title.stats
+        except cls.DoesNotExist:
+            return cls(title=title)
+
+    @property
+    def scores(self):
+        return {
+            score: getattr(self, f'score_{score}')
+            for score in range(1, 11)
+        }
+
+    @property
+    def review_count(self):
+        return sum(self.scores.values())
+
+    def __str__(self) -> str:
+        return f'{self.title_id}: {self.review_count}'
+
+
+class ChangeLog(models.Model):
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    ACTIONS = (
+        (CREATE, 'create'),
+        (UPDATE, 'update'),
+        (DELETE, 'delete'),
+    )
+
+    seq = models.BigAutoField('Номер изменения', primary_key=True)
+    model = models.CharField('Модель', max_length=20)
+    object_id = models.PositiveIntegerField('Объект')
+    action = models.CharField('Действие', max_length=6, choices=ACTIONS)
+    created_at = models.DateTimeField(
+        'Дата изменения', auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Журнал изменений'
+        indexes = [
+            models.Index(
+                fields=('model', 'object_id'),
+                name='changelog_object_idx'
+            ),
+        ]
+        ordering = ('seq',)
+
+    def __str__(self) -> str:
+        return f'{self.seq}: {self.action} {self.model} {self.object_id}'
+
+
+class OutgoingEmail(models.Model):
+    subject = models.CharField('Тема', max_length=255)
+    body = models.TextField('Текст')
+    from_email = models.CharField('Отправитель', max_length=254)
+    recipient = models.EmailField('Получатель')
+    created_at = models.DateTimeField('Дата создания', auto_now_add=True)
+    next_attempt_at = models.DateTimeField(
+        'Следующая попытка', default=timezone.now)
+    attempts = models.PositiveSmallIntegerField('Попытки', default=0)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    sent_at = models.DateTimeField('Дата отправки', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        indexes = [
+            models.Index(
+                fields=('sent_at', 'next_attempt_at'),
+                name='outgoing_email_pending_idx'
+            ),
+        ]
+        ordering = ('id',)
+
+    def as_message(self, connection=None):
+        return EmailMessage(
+            self.subject, self.body, self.from_email, [self.recipient],
+            connection=connection)
+
+    def __str__(self) -> str:
+        return f'{self.recipient}: {self.subject}'
@@ -0,0 +1,84 @@
+from django.db import connections, transaction
+
+from .changes import TRACKED_MODELS, log_changes
+from .models import ChangeLog, Comment, Review, Title, User
+from .ratings import rebuild_title_ratings, rebuild_title_stats
+
+
+def delete_in_batches(queryset, batch_size):
+    ''' Deletes the rows of the queryset with raw
+    `DELETE ... WHERE id IN (...)` statements, batch_size ids at a time.
+
+    Every batch runs in its own transaction, so locks are short and
+    memory does not grow with the number of rows. Model signals and
+    cascades are not run: children must be deleted first. Deletes of
+    tracked models are written to the change log as tombstones.
+    '''
+    model = queryset.model
+    connection = connections[queryset.db]
+    quote_name = connection.ops.quote_name
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    deleted = 0
+    while True:
+        with transaction.atomic(using=queryset.db):
+            batch = list(pks[:batch_size])
+            if batch:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'DELETE FROM {quote_name(model._meta.db_table)} '
+                        f'WHERE {quote_name(model._meta.pk.column)} '
+                        f'IN ({", ".join(["%s"] * len(batch))})',
+                        batch,
+                    )
+                if model in TRACKED_MODELS:
+                    log_changes(model, batch, ChangeLog.DELETE)
+        deleted += len(batch)
+        if len(batch) < batch_size:
+            return deleted
+
+
+def purge_user(user_id, batch_size):
+    delete_in_batches(Comment.objects.filter(author_id=user_id), batch_size)
+    delete_in_batches(
+        Comment.objects.filter(review__author_id=user_id), batch_size)
+    reviews = Review.objects.filter(author_id=user_id)
+    while True:
+        with transaction.atomic():
+            batch = list(
+                reviews.order_by('pk').values_list('pk', 'title_id')
+                [:batch_size])
+            if not batch:
+                break
+            delete_in_batches(Review.objects.filter(
+                pk__in=[review_id for review_id, _ in batch]), batch_size)
+            titles = Title.all_objects.filter(
+                pk__in={title_id for _, title_id in batch})
+            rebuild_title_ratings(titles)
+            rebuild_title_stats(titles, batch_size)
+    User.objects.filter(pk=user_id).delete()
+
+
+def purge_title(title_id, batch_size):
+    delete_in_batches(
+        Comment.objects.filter(review__title_id=title_id), batch_size)
+    delete_in_batches(Review.objects.filter(title_id=title_id), batch_size)
+    Title.all_objects.filter(pk=title_id).delete()
+
+
+def purge_deleted(batch_size):
+    ''' Purges every soft-deleted user and title, one at a time.
+    Returns the number of purged objects '''
+    purged = 0
+    for model, manager, purge in (
+        (User, User.objects, purge_user),
+        (Title, Title.all_objects, purge_title),
+    ):
+        deleted = manager.filter(deleted_at__isnull=False).order_by(
+            'deleted_at')
+        while True:
+            pk = deleted.values_list('pk', flat=True).first()
+            if pk is None:
+                break
+            purge(pk, batch_size)
+            purged += 1
+    return purged
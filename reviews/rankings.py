@@ -0,0 +1,51 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import Review, Title, TitleRanking
+
+
+def refresh_rankings(window_days, min_votes):
+    ''' Rebuilds TitleRanking for all titles with at least one review.
+
+    weighted_rating is the Bayesian average (v * R + m * C) / (v + m),
+    where v is the number of reviews of the title, R its mean score,
+    C the mean score over all reviews and m = min_votes. trending_score
+    is the number of reviews per day over the last window_days.
+    Positions are stored, so a page of the leaderboard is an index
+    range scan whatever the size of the catalog.
+    '''
+    now = timezone.now()
+    totals = Title.objects.aggregate(
+        scores=Sum('score_sum'), reviews=Sum('review_count'))
+    mean = (totals['scores'] or 0) / (totals['reviews'] or 1)
+    recent = dict(
+        Review.objects.filter(pub_date__gte=now - timedelta(days=window_days))
+        .order_by().values_list('title').annotate(count=Count('pk'))
+    )
+    rankings = []
+    for title_id, review_count, score_sum in Title.objects.filter(
+            review_count__gt=0).values_list(
+            'id', 'review_count', 'score_sum').iterator():
+        recent_reviews = recent.get(title_id, 0)
+        rankings.append(TitleRanking(
+            title_id=title_id,
+            weighted_rating=(score_sum + min_votes * mean) / (
+                review_count + min_votes),
+            recent_reviews=recent_reviews,
+            trending_score=recent_reviews / window_days,
+            refreshed_at=now,
+        ))
+    rankings.sort(key=lambda item: (-item.weighted_rating, -item.title_id))
+    for position, ranking in enumerate(rankings, 1):
+        ranking.top_position = position
+    rankings.sort(key=lambda item: (
+        -item.trending_score, -item.weighted_rating, -item.title_id))
+    for position, ranking in enumerate(rankings, 1):
+        ranking.trending_position = position
+    with transaction.atomic():
+        TitleRanking.objects.all().delete()
+        TitleRanking.objects.bulk_create(rankings)
+    return len(rankings)
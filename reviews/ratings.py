@@ -0,0 +1,148 @@
+from django.db import IntegrityError, transaction
+from django.db.models import (Count, F, FloatField, IntegerField, Max, Min,
+                              OuterRef, Q, Subquery, Sum, Value)
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Review, Title, TitleStats
+
+# Sent with the rebuilt `queryset`; bulk updates send no model signals
+ratings_rebuilt = Signal()
+stats_rebuilt = Signal()
+
+
+def update_title_rating(title_id, count_delta=0, score_delta=0):
+    ''' Applies a review change to the stored rating of a title.
+
+    Uses a single UPDATE with F() expressions, so concurrent reviews
+    of the same title do not overwrite each other.
+    '''
+    review_count = F('review_count') + count_delta
+    score_sum = F('score_sum') + score_delta
+    Title.all_objects.filter(pk=title_id).update(
+        review_count=review_count,
+        score_sum=score_sum,
+        rating=Cast(score_sum, FloatField()) / NullIf(review_count, 0),
+        updated_at=timezone.now(),
+    )
+
+
+def rebuild_title_ratings(queryset=None):
+    ''' Recalculates stored ratings of the given titles from their reviews '''
+    if queryset is None:
+        queryset = Title.all_objects.all()
+    reviews = Review.objects.filter(
+        title=OuterRef('pk')).order_by().values('title')
+    review_count = Coalesce(
+        Subquery(reviews.annotate(value=Count('pk')).values('value'),
+                 output_field=IntegerField()), 0)
+    score_sum = Coalesce(
+        Subquery(reviews.annotate(value=Sum('score')).values('value'),
+                 output_field=IntegerField()), 0)
+    updated = queryset.update(
+        review_count=review_count,
+        score_sum=score_sum,
+        rating=Cast(score_sum, FloatField()) / NullIf(review_count, 0),
+        updated_at=timezone.now(),
+    )
+    ratings_rebuilt.send(sender=Title, queryset=queryset)
+    return updated
+
+
+def count_title_stats(reviews):
+    ''' Returns TitleStats field values per title of the reviews,
+    counted with one grouped query '''
+    return reviews.order_by().values('title_id').annotate(
+        first_review_at=Min('pub_date'),
+        last_review_at=Max('pub_date'),
+        **{
+            f'score_{score}': Count('pk', filter=Q(score=score))
+            for score in range(1, 11)
+        },
+    )
+
+
+def update_title_stats(title_id, score=None, old_score=None, pub_date=None):
+    ''' Applies a review change to the score histogram of a title:
+    `score` is counted and `old_score` uncounted. `pub_date` is the date
+    of a new review; when a review is only removed, the first and last
+    review dates are looked up again.
+
+    Like update_title_rating it is a single UPDATE with F() expressions.
+    A title without a stats row gets one counted from its reviews.
+    '''
+    values = {}
+    for value, delta in ((old_score, -1), (score, 1)):
+        if value is not None:
+            name = f'score_{value}'
+            values[name] = values.get(name, F(name)) + delta
+    if pub_date is not None:
+        values['first_review_at'] = Coalesce(
+            F('first_review_at'), Value(pub_date))
+        values['last_review_at'] = Value(pub_date)
+    elif score is None:
+        reviews = Review.objects.filter(
+            title_id=OuterRef('pk')).values('pub_date')
+        values['first_review_at'] = Subquery(
+            reviews.order_by('pub_date')[:1])
+        values['last_review_at'] = Subquery(
+            reviews.order_by('-pub_date')[:1])
+    stats = TitleStats.objects.filter(pk=title_id)
+    if not values or stats.update(**values):
+        return
+    row = count_title_stats(Review.objects.filter(title_id=title_id)).first()
+    if row is None:
+        return
+    try:
+        with transaction.atomic():
+            TitleStats.objects.create(**row)
+    except IntegrityError:
+        # Created by a concurrent review of the same title
+        stats.update(**values)
+
+
+def rebuild_title_stats(queryset=None, batch_size=1000):
+    ''' Recounts the stats of the given titles from their reviews,
+    batch_size titles per transaction. Only rows that drifted are
+    rewritten; returns their number '''
+    if queryset is None:
+        queryset = Title.all_objects.all()
+    title_ids = queryset.order_by('pk').values_list('pk', flat=True)
+    fields = [field.attname for field in TitleStats._meta.concrete_fields]
+    fixed = 0
+    last_id = None
+    while True:
+        batch_ids = title_ids
+        if last_id is not None:
+            batch_ids = batch_ids.filter(pk__gt=last_id)
+        batch_ids = list(batch_ids[:batch_size])
+        if not batch_ids:
+            return fixed
+        last_id = batch_ids[-1]
+        with transaction.atomic():
+            stored = TitleStats.objects.select_for_update().in_bulk(
+                batch_ids)
+            counted = {
+                row['title_id']: TitleStats(**row)
+                for row in count_title_stats(
+                    Review.objects.filter(title_id__in=batch_ids))
+            }
+            stale = []
+            for title_id in batch_ids:
+                old, new = stored.get(title_id), counted.get(title_id)
+                if old is None and new is None:
+                    continue
+                new = new or TitleStats(title_id=title_id)
+                if old is None or any(
+                        getattr(old, name) != getattr(new, name)
+                        for name in fields):
+                    stale.append(new)
+            if stale:
+                TitleStats.objects.filter(
+                    pk__in=[stats.pk for stats in stale]).delete()
+                TitleStats.objects.bulk_create(stale)
+                stats_rebuilt.send(
+                    sender=Title, queryset=Title.all_objects.filter(
+                        pk__in=[stats.pk for stats in stale]))
+        fixed += len(stale)
@@ -0,0 +1,116 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    ''' Every test starts with an empty cache, so query counts do not
+    depend on earlier tests '''
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(params=(5, 10), ids=lambda size: f'page_size={size}')
+def page_size(request, monkeypatch):
+    monkeypatch.setattr(PageNumberPagination, 'page_size', request.param)
+    return request.param
+
+
+def client_for(user=None):
+    client = APIClient()
+    if user is not None:
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+@pytest.fixture
+def admin(db):
+    return User.objects.create_user('admin', 'admin@yamdb.fake', role='admin')
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user('user', 'user@yamdb.fake')
+
+
+@pytest.fixture
+def admin_client(admin):
+    return client_for(admin)
+
+
+@pytest.fixture
+def user_client(user):
+    return client_for(user)
+
+
+@pytest.fixture
+def anon_client():
+    return client_for()
+
+
+@pytest.fixture
+def users(db):
+    return [
+        User.objects.create_user(
+            f'reader{number}', f'reader{number}@yamdb.fake')
+        for number in range(12)
+    ]
+
+
+@pytest.fixture
+def category(db):
+    return Category.objects.create(name='Фильм', slug='movie')
+
+
+@pytest.fixture
+def genres(db):
+    return [
+        Genre.objects.create(name='Драма', slug='drama'),
+        Genre.objects.create(name='Комедия', slug='comedy'),
+    ]
+
+
+@pytest.fixture
+def titles(category, genres):
+    titles = []
+    for number in range(12):
+        title = Title.objects.create(
+            name=f'Произведение {number}', year=2000 + number,
+            category=category)
+        title.genre.set(genres)
+        titles.append(title)
+    return titles
+
+
+@pytest.fixture
+def title(titles):
+    return titles[0]
+
+
+@pytest.fixture
+def reviews(title, users):
+    return [
+        Review.objects.create(title=title, author=author, text='Отзыв',
+                              score=number % 10 + 1)
+        for number, author in enumerate(users)
+    ]
+
+
+@pytest.fixture
+def review(reviews):
+    return reviews[0]
+
+
+@pytest.fixture
+def comments(review, users):
+    return [
+        Comment.objects.create(review=review, author=author, text='Коммент')
+        for author in users
+    ]
@@ -0,0 +1,37 @@
+''' The bulk routes accept only the methods their viewset implements,
+and the slug they take cannot be given to a category or a genre. '''
+import pytest
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('prefix', ['categories', 'genres'])
+def test_bulk_slug_is_reserved(admin_client, prefix):
+    response = admin_client.post(
+        f'/api/v1/{prefix}/', {'name': 'Bulk', 'slug': 'bulk'})
+    assert response.status_code == 400
+    assert 'slug' in response.json()
+
+    response = admin_client.post(
+        f'/api/v1/{prefix}/bulk/', [{'name': 'Bulk', 'slug': 'bulk'}],
+        format='json')
+    assert response.status_code == 400
+    assert 'slug' in response.json()['errors'][0]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('prefix', ['categories', 'genres'])
+def test_bulk_update_is_not_routed(admin_client, prefix):
+    response = admin_client.patch(
+        f'/api/v1/{prefix}/bulk/', [], format='json')
+    assert response.status_code == 405
+    assert 'PATCH' not in response['Allow']
+
+
+@pytest.mark.django_db
+def test_title_bulk_update(admin_client, titles):
+    response = admin_client.patch(
+        '/api/v1/titles/bulk/', [{'id': titles[0].id, 'year': 1999}],
+        format='json')
+    assert response.status_code == 200
+    titles[0].refresh_from_db()
+    assert titles[0].year == 1999
@@ -0,0 +1,27 @@
+''' ETags come from the generation counters of the cache, so a matching
+If-None-Match is answered without queries and every write, deletes
+included, changes the ETag. '''
+import pytest
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reviews_etag(anon_client, title, review, django_assert_num_queries):
+    url = f'/api/v1/titles/{title.id}/reviews/'
+    etag = anon_client.get(url)['ETag']
+    with django_assert_num_queries(0):
+        response = anon_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    review.delete()
+    response = anon_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+@pytest.mark.django_db(transaction=True)
+def test_genres_etag(anon_client, admin_client, genres):
+    etag = anon_client.get('/api/v1/genres/')['ETag']
+    response = admin_client.delete(f'/api/v1/genres/{genres[0].slug}/')
+    assert response.status_code == 204
+    response = anon_client.get('/api/v1/genres/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert len(response.data['results']) == 1
@@ -0,0 +1,44 @@
+''' List endpoints run a fixed number of queries whatever the page size:
+related objects are joined or prefetched, never loaded per row. '''
+import pytest
+
+
+@pytest.mark.django_db
+def test_titles_list(anon_client, titles, page_size,
+                     django_assert_num_queries):
+    # count, page, genres
+    with django_assert_num_queries(3):
+        response = anon_client.get('/api/v1/titles/')
+    assert response.status_code == 200
+    assert len(response.data['results']) == page_size
+
+
+@pytest.mark.django_db
+def test_reviews_list(anon_client, title, reviews, page_size,
+                      django_assert_num_queries):
+    # title, count, page
+    with django_assert_num_queries(3):
+        response = anon_client.get(f'/api/v1/titles/{title.id}/reviews/')
+    assert response.status_code == 200
+    assert len(response.data['results']) == page_size
+
+
+@pytest.mark.django_db
+def test_comments_list(anon_client, title, review, comments, page_size,
+                       django_assert_num_queries):
+    # review, count, page
+    with django_assert_num_queries(3):
+        response = anon_client.get(
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/')
+    assert response.status_code == 200
+    assert len(response.data['results']) == page_size
+
+
+@pytest.mark.django_db
+def test_users_list(admin_client, users, page_size,
+                    django_assert_num_queries):
+    # authenticated user, count, page
+    with django_assert_num_queries(3):
+        response = admin_client.get('/api/v1/users/')
+    assert response.status_code == 200
+    assert len(response.data['results']) == page_size
@@ -0,0 +1,37 @@
+''' Responses that go into the shared response cache are read from the
+primary, never from a replica that may lag behind the last write. '''
+import pytest
+from django.db import DEFAULT_DB_ALIAS
+
+from api import db_routers
+
+
+@pytest.fixture
+def replica_reads(monkeypatch):
+    ''' Records the databases reads are routed to, with one replica '''
+    aliases = []
+    route = db_routers.ReplicaRouter.db_for_read
+
+    def db_for_read(router, model, **hints):
+        alias = route(router, model, **hints)
+        aliases.append(alias)
+        return DEFAULT_DB_ALIAS
+
+    monkeypatch.setattr(db_routers, 'get_replicas', lambda: ['replica_1'])
+    monkeypatch.setattr(db_routers.ReplicaRouter, 'db_for_read', db_for_read)
+    return aliases
+
+
+@pytest.mark.django_db
+def test_cache_miss_reads_primary(anon_client, titles, replica_reads):
+    response = anon_client.get('/api/v1/titles/')
+    assert response['X-Cache'] == 'MISS'
+    assert set(replica_reads) == {DEFAULT_DB_ALIAS}
+
+
+@pytest.mark.django_db
+def test_uncached_list_reads_replica(anon_client, title, review,
+                                     replica_reads):
+    response = anon_client.get(f'/api/v1/titles/{title.id}/reviews/')
+    assert response.status_code == 200
+    assert 'replica_1' in replica_reads
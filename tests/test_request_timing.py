@@ -0,0 +1,33 @@
+''' Request timing is off by default and, when on, times serialization
+without patching DRF. '''
+import pytest
+from rest_framework import serializers
+
+from api.middleware import current_timing
+
+
+def test_drf_serializers_are_untouched():
+    assert serializers.Serializer.data.fget.__module__ == (
+        'rest_framework.serializers')
+
+
+@pytest.mark.django_db
+def test_timing_is_off_by_default(anon_client, titles):
+    response = anon_client.get('/api/v1/titles/')
+    assert response.status_code == 200
+    assert 'Server-Timing' not in response
+
+
+@pytest.mark.django_db
+def test_server_timing(settings, anon_client, titles):
+    settings.REQUEST_TIMING = True
+    response = anon_client.get('/api/v1/titles/')
+    assert response.status_code == 200
+    parts = dict(
+        part.strip().split(';', 1) for part in
+        response['Server-Timing'].split(',')
+    )
+    assert set(parts) == {'db', 'view', 'serialize', 'render', 'total'}
+    assert float(parts['serialize'].split('=')[1]) > 0
+    assert 'desc="TitleViewSet.list"' in response['Server-Timing']
+    assert current_timing.get() is None
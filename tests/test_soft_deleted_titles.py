@@ -0,0 +1,33 @@
+''' Reviews and comments of a soft-deleted title are gone from every
+endpoint, like the title itself. '''
+import json
+
+import pytest
+
+
+@pytest.fixture
+def deleted_title(title, review, comments):
+    title.soft_delete()
+    return title
+
+
+@pytest.mark.django_db
+def test_review_and_comment_urls(anon_client, deleted_title, review,
+                                 comments):
+    url = f'/api/v1/titles/{deleted_title.id}/reviews/'
+    assert anon_client.get(url).status_code == 404
+    assert anon_client.get(f'{url}{review.id}/').status_code == 404
+    assert anon_client.get(
+        f'{url}{review.id}/comments/{comments[0].id}/').status_code == 404
+
+
+@pytest.mark.django_db
+def test_review_export(admin_client, titles, deleted_title, review, user):
+    titles[1].reviews.create(author=user, text='Отзыв', score=5)
+    response = admin_client.get('/api/v1/export/reviews/?output=ndjson')
+    assert response.status_code == 200
+    rows = [
+        json.loads(line)
+        for line in b''.join(response.streaming_content).splitlines()
+    ]
+    assert [row['title_id'] for row in rows] == [titles[1].id]
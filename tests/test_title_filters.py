@@ -0,0 +1,93 @@
+''' Genre and category filters are subqueries served by the composite
+indexes of migration 0010, never joins that duplicate titles. '''
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.filters import TitleFilter
+from reviews.models import Category, Genre, Title
+
+
+def filtered(data):
+    return TitleFilter(data, queryset=Title.objects.order_by('-id')).qs
+
+
+@pytest.fixture
+def catalog(db):
+    ''' 1000 analyzed titles in ten categories; the `rare` genre and
+    a category after 2015 match a handful of them '''
+    categories = [
+        Category.objects.create(name=f'Категория {number}',
+                                slug=f'category{number}')
+        for number in range(10)
+    ]
+    genres = [
+        Genre.objects.create(name=slug, slug=slug)
+        for slug in ('drama', 'comedy', 'rare')
+    ]
+    titles = Title.objects.bulk_create(
+        Title(name=f'Произведение {number}', year=1950 + number % 70,
+              category=categories[number % 10])
+        for number in range(1000)
+    )
+    if titles[0].pk is None:
+        titles = list(Title.objects.all())
+    Through = Title.genre.through
+    Through.objects.bulk_create(
+        Through(title_id=title.pk, genre_id=genre.pk)
+        for number, title in enumerate(titles)
+        for genre in (genres[:2] if number % 200 else genres)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+@pytest.mark.django_db
+def test_genre_filter_uses_exists(anon_client, titles):
+    with CaptureQueriesContext(connection) as context:
+        response = anon_client.get('/api/v1/titles/?genre=drama,comedy')
+    assert response.status_code == 200
+    assert response.data['count'] == len(titles)
+    page_sql = next(
+        query['sql'] for query in context.captured_queries
+        if 'LIMIT' in query['sql'])
+    assert 'EXISTS' in page_sql
+    assert 'JOIN "reviews_title_genre"' not in page_sql
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('match, count', (('any', 12), ('all', 0)))
+def test_genre_match(anon_client, titles, genres, match, count):
+    Genre.objects.create(name='Ужасы', slug='horror')
+    response = anon_client.get(
+        f'/api/v1/titles/?genre=drama,horror&genre_match={match}')
+    assert response.data['count'] == count
+
+
+@pytest.mark.django_db
+def test_category_filter_uses_subquery(titles):
+    sql = str(filtered({'category': 'movie,book'}).query)
+    assert 'JOIN "reviews_category"' not in sql
+    assert filtered({'category': 'movie,book'}).count() == len(titles)
+
+
+def explain(queryset):
+    if connection.vendor != 'postgresql':
+        pytest.skip('plans are checked on PostgreSQL')
+    with connection.cursor() as cursor:
+        # The test tables are small: keep sequential scans out of the
+        # way, the test transaction resets it
+        cursor.execute('SET LOCAL enable_seqscan = off')
+    return queryset.explain()
+
+
+@pytest.mark.django_db
+def test_genre_filter_plan(catalog):
+    plan = explain(filtered({'genre': 'rare'})[:10])
+    assert 'title_genre_genre_title_idx' in plan
+
+
+@pytest.mark.django_db
+def test_category_year_filter_plan(catalog):
+    plan = explain(filtered({'category': 'category1', 'min_year': 2015})[:10])
+    assert 'title_category_year_idx' in plan
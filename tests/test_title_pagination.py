@@ -0,0 +1,46 @@
+''' Cursor pages walk a fixed ordering; parameters that would reorder
+the titles are refused instead of being silently dropped. '''
+import pytest
+
+from reviews.models import Title
+
+
+@pytest.fixture
+def rated_titles(titles):
+    for number, title in enumerate(titles):
+        Title.objects.filter(pk=title.pk).update(rating=(number * 7) % 10)
+    return titles
+
+
+@pytest.mark.django_db
+def test_ordering_in_page_mode(anon_client, rated_titles):
+    response = anon_client.get('/api/v1/titles/?ordering=-rating')
+    assert response.status_code == 200
+    ratings = [title['rating'] for title in response.data['results']]
+    assert ratings == sorted(ratings, reverse=True)
+
+
+@pytest.mark.django_db
+def test_ordering_in_cursor_mode(anon_client, rated_titles):
+    response = anon_client.get(
+        '/api/v1/titles/?pagination=cursor&ordering=-rating')
+    assert response.status_code == 400
+    assert 'ordering' in response.data
+
+
+@pytest.mark.django_db
+def test_cursor_mode(anon_client, rated_titles):
+    response = anon_client.get('/api/v1/titles/?pagination=cursor')
+    assert response.status_code == 200
+    ids = [title['id'] for title in response.data['results']]
+    assert ids == sorted(ids, reverse=True)
+
+
+@pytest.mark.django_db
+def test_search_in_cursor_mode(anon_client, rated_titles):
+    response = anon_client.get(
+        '/api/v1/titles/?pagination=cursor&search=Произведение')
+    assert response.status_code == 400
+    assert 'search' in response.data
+    response = anon_client.get('/api/v1/titles/?search=Произведение')
+    assert response.status_code == 200
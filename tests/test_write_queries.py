@@ -0,0 +1,32 @@
+''' Writes keep a pinned number of queries: the parent is resolved once
+and the rating, stats and change log are updated in place. '''
+import pytest
+
+from reviews.models import Comment, Title, TitleStats
+
+
+@pytest.mark.django_db
+def test_review_create(user_client, title, django_assert_num_queries):
+    TitleStats.objects.create(title=title)
+    # user, title, review, two change log entries, rating, stats, and
+    # the savepoint pair of the atomic block inside the test transaction
+    with django_assert_num_queries(9):
+        response = user_client.post(
+            f'/api/v1/titles/{title.id}/reviews/',
+            {'text': 'Отзыв', 'score': 7}, format='json')
+    assert response.status_code == 201
+    title = Title.objects.get(pk=title.pk)
+    assert (title.review_count, title.rating) == (1, 7)
+    assert TitleStats.objects.get(title=title).score_7 == 1
+
+
+@pytest.mark.django_db
+def test_comment_create(user_client, title, review,
+                        django_assert_num_queries):
+    # user, review, comment, change log entry
+    with django_assert_num_queries(4):
+        response = user_client.post(
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/',
+            {'text': 'Коммент'}, format='json')
+    assert response.status_code == 201
+    assert Comment.objects.filter(review=review).count() == 1